@@ -1,4 +1,13 @@
 import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+CHUNK_ROWS = 100_000  # Сколько строк CSV разбирать за раз в пакетном режиме
+INT64_MAX = int(np.iinfo(np.int64).max)
 
 
 def read_and_calculate_expenses(filename):
@@ -6,7 +15,7 @@ def read_and_calculate_expenses(filename):
         total = 0
         print("Нужно купить:")
 
-        with open(filename, mode='r', encoding='utf-8') as file:
+        with open(filename, mode='r', encoding='utf-8-sig') as file:
             reader = csv.reader(file)
             next(reader)
 
@@ -25,5 +34,161 @@ def read_and_calculate_expenses(filename):
         print(f"Произошла ошибка: {str(e)}")
 
 
-filename = 'products.csv'
-read_and_calculate_expenses(filename)
\ No newline at end of file
+def int_column(values):
+    """Столбец int64, а если числа в него не помещаются - столбец целых Python (dtype=object)"""
+    try:
+        return np.array(values, dtype=np.int64)
+    except OverflowError:
+        return np.array(values, dtype=object)
+
+
+def abs_max(column):
+    """Наибольшее по модулю значение столбца как целое Python (0 для пустого столбца)"""
+    if not len(column):
+        return 0
+    return max(abs(int(column.min())), abs(int(column.max())))
+
+
+def parse_chunk(rows, first_line, filename):
+    """Превращает строки CSV в столбцы (названия, количество, цена).
+
+    Если в блоке есть некорректные строки, они пропускаются с сообщением о номере строки.
+    Числа, не помещающиеся в int64, разбираются медленным путем в целые Python.
+    """
+    try:
+        if set(map(len, rows)) != {3}:
+            raise ValueError
+        names, quantities, prices = zip(*rows)
+        return (np.array(names), np.array(quantities).astype(np.int64),
+                np.array(prices).astype(np.int64))
+    except (ValueError, OverflowError):
+        pass
+
+    good = []
+    for line, row in enumerate(rows, first_line):
+        try:
+            product, quantity, price = row
+            good.append((product, int(quantity), int(price)))
+        except ValueError:
+            print(f"{filename}, строка {line}: некорректная запись {row}")
+    if not good:
+        return np.array([], dtype=str), np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    names, quantities, prices = zip(*good)
+    return np.array(names), int_column(quantities), int_column(prices)
+
+
+def read_chunks(filename, chunk_rows=CHUNK_ROWS):
+    """Читает CSV блоками по chunk_rows строк и выдает их столбцами"""
+    with open(filename, mode='r', encoding='utf-8-sig', newline='') as file:
+        reader = csv.reader(file)
+        next(reader, None)
+        line = 2
+        while True:
+            rows = list(islice(reader, chunk_rows))
+            if not rows:
+                return
+            yield parse_chunk(rows, line, filename)
+            line += len(rows)
+
+
+def aggregate_file(filename, chunk_rows=CHUNK_ROWS, print_rows=False):
+    """Считает итоговую сумму и суммы по продуктам для одного CSV.
+
+    Возвращает (названия, количество, стоимость, строк) - столбцы по продуктам.
+    Если суммы могут выйти за пределы int64, подсчет переходит на целые Python.
+    """
+    codes = {}  # продукт -> номер строки в столбцах итогов
+    quantities = np.zeros(0, dtype=np.int64)
+    costs = np.zeros(0, dtype=np.int64)
+    rows = 0
+
+    for names, quantity, price in read_chunks(filename, chunk_rows):
+        if print_rows:
+            sys.stdout.write("".join(
+                f"{name} - {q} шт. за {p} руб.\n" for name, q, p in zip(names, quantity.tolist(), price.tolist())
+            ))
+
+        # Оценка сверху: даже если все строки блока попадут в один продукт, итоги должны остаться в int64
+        if costs.dtype != object:
+            max_quantity, max_price = abs_max(quantity), abs_max(price)
+            if (abs_max(quantities) + len(names) * max_quantity > INT64_MAX
+                    or abs_max(costs) + len(names) * max_quantity * max_price > INT64_MAX):
+                quantities, costs = quantities.astype(object), costs.astype(object)
+        if costs.dtype == object:
+            quantity, price = quantity.astype(object), price.astype(object)
+
+        unique, inverse = np.unique(names, return_inverse=True)
+        chunk_codes = np.array([codes.setdefault(name, len(codes)) for name in unique.tolist()], dtype=np.int64)
+        if len(codes) > len(quantities):
+            quantities = np.concatenate([quantities, np.zeros(len(codes) - len(quantities), dtype=quantities.dtype)])
+            costs = np.concatenate([costs, np.zeros(len(codes) - len(costs), dtype=costs.dtype)])
+        index = chunk_codes[inverse]
+        np.add.at(quantities, index, quantity)
+        np.add.at(costs, index, quantity * price)
+        rows += len(names)
+
+    return list(codes), quantities, costs, rows
+
+
+def merge_results(results):
+    """Складывает итоги по нескольким файлам"""
+    totals = {}
+    rows = 0
+    for names, quantities, costs, file_rows in results:
+        rows += file_rows
+        for name, quantity, cost in zip(names, quantities.tolist(), costs.tolist()):
+            total_quantity, total_cost = totals.get(name, (0, 0))
+            totals[name] = (total_quantity + quantity, total_cost + cost)
+    return totals, rows
+
+
+def calculate_expenses_bulk(path, workers=None, chunk_rows=CHUNK_ROWS, print_rows=False):
+    """Пакетный подсчет расходов по одному CSV или по всем CSV в папке.
+
+    Файлы папки обрабатываются параллельно в пуле процессов. Построчный вывод
+    (print_rows) печатается блоками, поэтому строки разных файлов могут чередоваться.
+    """
+    try:
+        if os.path.isdir(path):
+            filenames = sorted(os.path.join(path, name) for name in os.listdir(path)
+                               if name.lower().endswith('.csv'))
+        else:
+            filenames = [path]
+        if not filenames:
+            print(f"В папке {path} нет CSV файлов.")
+            return
+
+        if len(filenames) > 1 and workers != 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(aggregate_file, filenames,
+                                            [chunk_rows] * len(filenames), [print_rows] * len(filenames)))
+        else:
+            results = [aggregate_file(filename, chunk_rows, print_rows) for filename in filenames]
+
+        totals, rows = merge_results(results)
+        print(f"Файлов: {len(filenames)}, строк: {rows}")
+        print("По продуктам:")
+        for name, (quantity, cost) in sorted(totals.items(), key=lambda item: -item[1][1]):
+            print(f"{name} - {quantity} шт. на {cost} руб.")
+        print(f"Итоговая сумма: {sum(cost for _, cost in totals.values())} руб.")
+
+    except FileNotFoundError as e:
+        print(f"Файл {e.filename} не найден.")
+    except Exception as e:
+        print(f"Произошла ошибка: {str(e)}")
+
+
+def main():
+    args = sys.argv[1:]
+    path = args[0] if args and not args[0].startswith('--') else 'products.csv'
+
+    if '--bulk' in args or os.path.isdir(path):
+        workers = int(args[args.index('--workers') + 1]) if '--workers' in args else None
+        chunk_rows = int(args[args.index('--chunk') + 1]) if '--chunk' in args else CHUNK_ROWS
+        calculate_expenses_bulk(path, workers, chunk_rows, print_rows='--rows' in args)
+    else:
+        read_and_calculate_expenses(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,164 @@
 import json
-
-
-def load_products(filename):
+import os
+import struct
+import sys
+from array import array
+
+LOG_FILE = 'products.jsonl'  # Журнал продуктов: один продукт в строке, новые дописываются в конец
+INDEX_FILE = 'products.jsonl.idx'  # Заголовок и смещения начала каждой строки журнала (uint64)
+# Заголовок индекса: сигнатура и номер inode журнала. Сжатие заменяет журнал новым файлом,
+# поэтому индекс от прежнего журнала (сбой между заменой журнала и индекса) распознается по номеру
+INDEX_HEADER = struct.Struct('<8sQ')
+INDEX_MAGIC = b'JSONLIX1'
+JSON_FILE = 'products.json'  # Снимок в старом формате, обновляется при сжатии журнала
+PAGE_SIZE = 20
+
+
+def write_atomic(filename, write):
+    """Записывает файл через временный файл и os.replace: при сбое остается старая версия"""
+    tmp = filename + '.tmp'
+    with open(tmp, 'w', encoding='utf-8', newline='\n') as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp, filename)
+
+
+def import_json(json_file, log_file):
+    """Переносит продукты из старого products.json в журнал (однократно)"""
     try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            return json.load(file)
+        with open(json_file, 'r', encoding='utf-8') as file:
+            products = json.load(file)['products']
     except FileNotFoundError:
-        return {"products": []}
-    except json.JSONDecodeError:
+        products = []
+    except (json.JSONDecodeError, KeyError):
         print("Ошибка чтения файла. Создана новая структура данных.")
-        return {"products": []}
-
-
-def save_products(filename, data):
-    with open(filename, 'w', encoding='utf-8') as file:
-        json.dump(data, file, ensure_ascii=False, indent=2)
-
-
-def add_product(data):
+        products = []
+
+    write_atomic(log_file, lambda file: file.writelines(
+        json.dumps(product, ensure_ascii=False) + '\n' for product in products
+    ))
+
+
+def build_index(log_file, offsets, start=0):
+    """Добавляет в offsets смещения строк журнала начиная с позиции start"""
+    with open(log_file, 'rb') as file:
+        file.seek(start)
+        position = start
+        for line in file:
+            offsets.append(position)
+            position += len(line)
+
+
+def log_generation(log_file):
+    """Номер inode журнала: не меняется при дописывании и меняется при замене файла"""
+    return os.stat(log_file).st_ino
+
+
+def write_index(index_file, offsets, generation):
+    """Атомарно записывает индекс с заголовком"""
+    with open(index_file + '.tmp', 'wb') as file:
+        file.write(INDEX_HEADER.pack(INDEX_MAGIC, generation))
+        offsets.tofile(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(index_file + '.tmp', index_file)
+
+
+def open_store(log_file=LOG_FILE, index_file=INDEX_FILE):
+    """Открывает журнал и возвращает индекс смещений, восстанавливая их после сбоя"""
+    if not os.path.exists(log_file):
+        import_json(JSON_FILE, log_file)
+
+    # Недописанная при сбое последняя строка отбрасывается
+    with open(log_file, 'rb+') as file:
+        size = file.seek(0, os.SEEK_END)
+        if size:
+            file.seek(max(0, size - 1))
+            if file.read(1) != b'\n':
+                file.seek(0)
+                end = file.read().rfind(b'\n') + 1
+                file.truncate(end)
+                size = end
+
+    offsets = array('Q')
+    generation = log_generation(log_file)
+    index_size = None  # Размер файла индекса, если индекс относится к этому журналу
+    if os.path.exists(index_file):
+        with open(index_file, 'rb') as file:
+            header = file.read(INDEX_HEADER.size)
+            data = file.read()
+        if len(header) == INDEX_HEADER.size and INDEX_HEADER.unpack(header) == (INDEX_MAGIC, generation):
+            index_size = len(header) + len(data)
+            # Недописанное при сбое смещение отбрасывается
+            offsets.frombytes(data[:len(data) - len(data) % offsets.itemsize])
+    while offsets and offsets[-1] >= size:
+        offsets.pop()
+
+    # Строки, записанные в журнал, но не попавшие в индекс, дочитываются с последней известной
+    if offsets:
+        last = offsets.pop()
+        build_index(log_file, offsets, last)
+    else:
+        build_index(log_file, offsets)
+    if index_size != INDEX_HEADER.size + len(offsets) * offsets.itemsize:
+        write_index(index_file, offsets, generation)
+    return offsets
+
+
+def iter_products(offsets, start=0, stop=None, log_file=LOG_FILE):
+    """Читает продукты с номерами start..stop, не загружая весь журнал"""
+    stop = len(offsets) if stop is None else min(stop, len(offsets))
+    if start >= stop:
+        return
+    with open(log_file, 'r', encoding='utf-8') as file:
+        file.seek(offsets[start])
+        for number in range(start, stop):
+            line = file.readline()
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Пропущена поврежденная запись №{number + 1}")
+
+
+def append_product(offsets, product, log_file=LOG_FILE, index_file=INDEX_FILE):
+    """Дописывает продукт в конец журнала и его смещение в индекс"""
+    line = (json.dumps(product, ensure_ascii=False) + '\n').encode('utf-8')
+    with open(log_file, 'ab') as file:
+        offset = file.seek(0, os.SEEK_END)
+        file.write(line)
+        file.flush()
+        os.fsync(file.fileno())
+    offsets.append(offset)
+    with open(index_file, 'ab') as file:
+        array('Q', [offset]).tofile(file)
+
+
+def compact(offsets, log_file=LOG_FILE, index_file=INDEX_FILE, json_file=JSON_FILE):
+    """Переписывает журнал без поврежденных записей и обновляет снимок products.json.
+
+    Все файлы заменяются атомарно, продукты читаются и пишутся потоком.
+    """
+    def write_log(file):
+        for product in iter_products(offsets, log_file=log_file):
+            file.write(json.dumps(product, ensure_ascii=False) + '\n')
+
+    def write_snapshot(file):
+        file.write('{\n  "products": [')
+        for number, product in enumerate(iter_products(new_offsets, log_file=log_file)):
+            file.write(',\n    ' if number else '\n    ')
+            file.write(json.dumps(product, ensure_ascii=False))
+        file.write('\n  ]\n}\n')
+
+    write_atomic(log_file, write_log)
+    new_offsets = array('Q')
+    build_index(log_file, new_offsets)
+    write_index(index_file, new_offsets, log_generation(log_file))
+    write_atomic(json_file, write_snapshot)
+    offsets[:] = new_offsets
+
+
+def add_product(offsets):
     print("\nДобавление нового продукта:")
     name = input("Название: ")
     price = int(input("Цена: "))
@@ -31,37 +172,43 @@ def add_product(data):
         "weight": weight
     }
 
-    data['products'].append(new_product)
+    append_product(offsets, new_product)
     print("Продукт успешно добавлен!")
 
 
-def display_products(data):
+def display_products(offsets, start=0):
+    """Показывает продукты страницами по PAGE_SIZE"""
     print("\nТекущий список продуктов:")
-    for product in data['products']:
-        print(f"\nНазвание: {product['name']}")
-        print(f"Цена: {product['price']}")
-        print(f"Вес: {product['weight']}")
-        print("В наличии" if product['available'] else "Нет в наличии!")
+    while start < len(offsets):
+        for product in iter_products(offsets, start, start + PAGE_SIZE):
+            print(f"\nНазвание: {product['name']}")
+            print(f"Цена: {product['price']}")
+            print(f"Вес: {product['weight']}")
+            print("В наличии" if product['available'] else "Нет в наличии!")
+        start += PAGE_SIZE
+        if start < len(offsets) and input("\nПоказать еще? (да/нет): ").lower() != 'да':
+            break
 
 
 def main():
-    filename = 'products.json'
+    offsets = open_store()
 
-    data = load_products(filename)
+    if '--compact' in sys.argv:
+        compact(offsets)
+        print(f"Журнал сжат, продуктов: {len(offsets)}")
+        return
 
-    display_products(data)
+    display_products(offsets)
 
     while True:
         choice = input("\nДобавить новый продукт? (да/нет): ").lower()
         if choice != 'да':
             break
-        add_product(data)
-
-    save_products(filename, data)
+        add_product(offsets)
 
     print("\nОбновленный список продуктов:")
-    display_products(data)
+    display_products(offsets)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
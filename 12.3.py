@@ -1,23 +1,44 @@
+import heapq
+import os
+import sys
+import tempfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
+
+RUN_PAIRS = 1_000_000  # Сколько пар (русское слово, английское) держать в памяти до сброса на диск
+MERGE_FAN_IN = 256  # Сколько файлов сливать за один проход
+SEPARATOR = '\0'  # Разделитель слов в промежуточных файлах: в словах его не бывает
+# Промежуточные файлы открываются с newline='\n': иначе одиночный '\r' внутри слова
+# считался бы концом строки при чтении, а в Windows '\n' при записи превращался бы в '\r\n'
+RUN_NEWLINE = '\n'
+
+
+def parse_line(line):
+    """Разбирает строку 'en - ru1, ru2' и возвращает (en, [ru1, ru2]) или None"""
+    line = line.strip()
+    if not line or '-' not in line:
+        return None
+
+    en_part, ru_part = line.split('-', 1)
+    en_word = en_part.strip()
+    ru_translations = [t.strip() for t in ru_part.split(',')]
+    return en_word, ru_translations
+
+
 def create_russian_english_dictionary(input_file, output_file):
-    ru_en_dict = {}
+    ru_en_dict = defaultdict(set)
 
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
+        with open(input_file, 'r', encoding='utf-8-sig') as f:
             for line in f:
-                line = line.strip()
-                if not line or '-' not in line:
+                parsed = parse_line(line)
+                if parsed is None:
                     continue
 
-                en_part, ru_part = line.split('-', 1)
-                en_word = en_part.strip()
-                ru_translations = [t.strip() for t in ru_part.split(',')]
-
+                en_word, ru_translations = parsed
                 for ru_word in ru_translations:
-                    if ru_word in ru_en_dict:
-                        if en_word not in ru_en_dict[ru_word]:
-                            ru_en_dict[ru_word].append(en_word)
-                    else:
-                        ru_en_dict[ru_word] = [en_word]
+                    ru_en_dict[ru_word].add(en_word)
 
         sorted_ru_words = sorted(ru_en_dict.keys())
 
@@ -34,4 +55,139 @@ def create_russian_english_dictionary(input_file, output_file):
         print(f"Произошла ошибка: {str(e)}")
 
 
-create_russian_english_dictionary('en-ru.txt', 'ru-en.txt')
\ No newline at end of file
+def write_run(pairs, directory):
+    """Сбрасывает отсортированные пары (ru, en) во временный файл и возвращает его путь"""
+    fd, path = tempfile.mkstemp(suffix='.run', dir=directory)
+    with open(fd, 'w', encoding='utf-8', newline=RUN_NEWLINE) as f:
+        f.writelines(f"{ru}{SEPARATOR}{en}\n" for ru, en in sorted(pairs))
+    return path
+
+
+def read_run(path):
+    with open(path, 'r', encoding='utf-8', newline=RUN_NEWLINE) as f:
+        for line in f:
+            ru, en = line[:-1].split(SEPARATOR, 1)
+            yield ru, en
+
+
+def shard_ranges(filename, shards):
+    """Делит файл на shards диапазонов байт, выровненных по началу строк"""
+    size = os.path.getsize(filename)
+    bounds = [0]
+    with open(filename, 'rb') as f:
+        for number in range(1, shards):
+            f.seek(max(size * number // shards, bounds[-1]))
+            f.readline()
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(filename, start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+
+def spill_shard(shard, directory, run_pairs=RUN_PAIRS):
+    """Разбирает часть файла en-ru и сбрасывает пары в отсортированные временные файлы"""
+    filename, start, end = shard
+    runs = []
+    pairs = set()
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        position = start
+        while position < end:
+            raw = f.readline()
+            if not raw:
+                break
+            position += len(raw)
+            parsed = parse_line(raw.decode('utf-8').lstrip('\ufeff'))
+            if parsed is None:
+                continue
+
+            en_word, ru_translations = parsed
+            pairs.update((ru_word, en_word) for ru_word in ru_translations)
+            if len(pairs) >= run_pairs:
+                runs.append(write_run(pairs, directory))
+                pairs = set()
+    if pairs:
+        runs.append(write_run(pairs, directory))
+    return runs
+
+
+def merge_runs(runs, directory):
+    """Сливает файлы по MERGE_FAN_IN за проход, пока не останется не больше MERGE_FAN_IN"""
+    while len(runs) > MERGE_FAN_IN:
+        merged = []
+        for i in range(0, len(runs), MERGE_FAN_IN):
+            group = runs[i:i + MERGE_FAN_IN]
+            fd, path = tempfile.mkstemp(suffix='.run', dir=directory)
+            with open(fd, 'w', encoding='utf-8', newline=RUN_NEWLINE) as f:
+                for (ru, en), _ in groupby(heapq.merge(*(read_run(run) for run in group))):
+                    f.write(f"{ru}{SEPARATOR}{en}\n")
+            for run in group:
+                os.remove(run)
+            merged.append(path)
+        runs = merged
+    return runs
+
+
+def create_russian_english_dictionary_external(input_files, output_file, run_pairs=RUN_PAIRS, workers=1):
+    """Строит ru-en для словарей, которые не помещаются в память.
+
+    Пары (ru, en) копятся во множестве и сбрасываются на диск отсортированными
+    файлами, которые затем сливаются heapq.merge. При workers > 1 части входных
+    файлов разбираются параллельно в пуле процессов.
+    """
+    try:
+        output_dir = os.path.dirname(os.path.abspath(output_file))
+        with tempfile.TemporaryDirectory(prefix='ru-en-', dir=output_dir) as directory:
+            shards = [shard for input_file in input_files for shard in shard_ranges(input_file, workers)]
+            if workers > 1 and len(shards) > 1:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    runs = [run for shard_runs in executor.map(spill_shard, shards, [directory] * len(shards),
+                                                               [run_pairs] * len(shards))
+                            for run in shard_runs]
+            else:
+                runs = [run for shard in shards for run in spill_shard(shard, directory, run_pairs)]
+
+            runs = merge_runs(runs, directory)
+            merged = heapq.merge(*(read_run(run) for run in runs))
+
+            # Пары приходят отсортированными, поэтому повторы идут подряд
+            tmp = output_file + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                for ru_word, group in groupby(merged, key=lambda pair: pair[0]):
+                    en_words = ', '.join(en for en, _ in groupby(en for _, en in group))
+                    f.write(f"{ru_word} - {en_words}\n")
+            os.replace(tmp, output_file)
+
+        print(f"Русско-английский словарь успешно создан в файле {output_file}")
+
+    except FileNotFoundError as e:
+        print(f"Ошибка: файл {e.filename} не найден")
+    except Exception as e:
+        print(f"Произошла ошибка: {str(e)}")
+
+
+def main():
+    args = sys.argv[1:]
+    options = {}
+    input_files = []
+    i = 0
+    while i < len(args):
+        if args[i] in ('-o', '--run-size', '--workers'):
+            options[args[i]] = args[i + 1]
+            i += 2
+        else:
+            if not args[i].startswith('--'):
+                input_files.append(args[i])
+            i += 1
+    output_file = options.get('-o', 'ru-en.txt')
+    input_files = input_files or ['en-ru.txt']
+
+    if '--external' in args or '--workers' in options or len(input_files) > 1:
+        create_russian_english_dictionary_external(input_files, output_file,
+                                                   int(options.get('--run-size', RUN_PAIRS)),
+                                                   int(options.get('--workers', 1)))
+    else:
+        create_russian_english_dictionary(input_files[0], output_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,196 @@
 import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: пиковую память замерить не получится
+    resource = None
+
+CHUNK_SIZE = 64 * 1024  # Сколько символов читать из файла за раз в потоковом режиме
+STRUCTURE = re.compile(r'[\[\]{}"]')
+STRING_END = re.compile(r'["\\]')
+SCALAR_END = re.compile(r'[,\]\s]')
+WHITESPACE = ' \t\r\n'
+VALUE_END = WHITESPACE + ',]'  # Символы, которыми может продолжаться массив после элемента
+decoder = json.JSONDecoder()
+
+
+class MalformedProduct(Exception):
+    """Элемент массива products, который не удалось разобрать"""
+
+    def __init__(self, number, position, reason):
+        super().__init__(f"продукт №{number} (символ {position}): {reason}")
+        self.number = number
+        self.position = position
+
+
+def iter_json_array(file, key='products', chunk_size=CHUNK_SIZE):
+    """Потоково выдает элементы массива key из объекта верхнего уровня.
+
+    file - текстовый файл. В памяти держится только текущий элемент и один
+    прочитанный блок. Вместо некорректного элемента выдается MalformedProduct
+    с его номером и позицией.
+    """
+    buffer = ''
+    base = 0  # Позиция buffer[0] в файле
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, eof
+        chunk = file.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+    def search(pattern):
+        """Ищет pattern с позиции pos, дочитывая файл; возвращает индекс или None в конце файла"""
+        while True:
+            match = pattern.search(buffer, pos)
+            if match:
+                return match.start()
+            if eof:
+                return None
+            fill()
+
+    def next_char():
+        """Пропускает пробельные символы и возвращает следующий символ ('' в конце файла)"""
+        nonlocal pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or eof:
+                return buffer[pos:pos + 1]
+            fill()
+
+    def skip_string():
+        """pos стоит на открывающей кавычке; переводит его за закрывающую"""
+        nonlocal pos
+        pos += 1
+        while True:
+            found = search(STRING_END)
+            if found is None:
+                pos = len(buffer)
+                return False
+            if buffer[found:found + 1] == '"':
+                pos = found + 1
+                return True
+            pos = found + 2
+            if pos > len(buffer):
+                if eof:
+                    return False
+                fill()
+
+    def skip_value():
+        """Переводит pos за конец значения, начинающегося с pos; False, если файл оборвался"""
+        nonlocal pos
+        first = buffer[pos:pos + 1]
+        if first == '"':
+            return skip_string()
+        if first not in ('{', '['):
+            found = search(SCALAR_END)
+            pos = len(buffer) if found is None else found
+            return True
+        depth = 0
+        while True:
+            found = search(STRUCTURE)
+            if found is None:
+                pos = len(buffer)
+                return False
+            pos = found
+            char = buffer[pos:pos + 1]
+            if char == '"':
+                if not skip_string():
+                    return False
+                continue
+            pos += 1
+            depth += 1 if char in ('{', '[') else -1
+            if depth == 0:
+                return True
+
+    # Поиск массива key среди ключей объекта верхнего уровня
+    fill()
+    if next_char() != '{':
+        raise KeyError(key)
+    pos += 1
+    while True:
+        char = next_char()
+        if char != '"':
+            raise KeyError(key)
+        start = pos
+        if not skip_string():
+            raise KeyError(key)
+        name = json.loads(buffer[start:pos])
+        if next_char() != ':':
+            raise KeyError(key)
+        pos += 1
+        if next_char() == '':
+            raise KeyError(key)
+        if name == key and buffer[pos:pos + 1] == '[':
+            pos += 1
+            break
+        skip_value()
+        if next_char() != ',':
+            raise KeyError(key)
+        pos += 1
+
+    number = 0
+    while True:
+        # Разобранное начало буфера отбрасывается, когда набирается хотя бы блок
+        if pos >= chunk_size:
+            base += pos
+            buffer = buffer[pos:]
+            pos = 0
+
+        char = next_char()
+        if char in (']', ''):
+            return
+        if char == ',':
+            pos += 1
+            continue
+
+        number += 1
+        start = pos
+        # Быстрый путь: запись целиком в буфере. Значение, закончившееся ровно в конце
+        # буфера, могло оборваться (число "-25" из "-25.5"), поэтому файл дочитывается
+        # и запись разбирается заново. После записи должен идти разделитель элементов
+        try:
+            product, end = decoder.raw_decode(buffer, pos)
+            while end == len(buffer) and not eof:
+                fill()
+                product, end = decoder.raw_decode(buffer, pos)
+            if end == len(buffer) or buffer[end] in VALUE_END:
+                pos = end
+                yield product
+                continue
+        except ValueError:
+            pass
+
+        # Медленный путь: граница записи ищется по скобкам с дочитыванием файла
+        complete = skip_value()
+        try:
+            if not complete:
+                raise ValueError("файл оборвался внутри записи")
+            yield json.loads(buffer[start:pos])
+        except ValueError as e:
+            yield MalformedProduct(number, base + start, e)
+            if not complete:
+                return
+
+
+def print_product(product):
+    print(f"Название: {product['name']}")
+    print(f"Цена: {product['price']}")
+    print(f"Вес: {product['weight']}")
+
+    if product['available']:
+        print("В наличии\n")
+    else:
+        print("Нет в наличии!\n")
 
 
 def display_products_from_json(filename):
@@ -7,14 +199,7 @@ def display_products_from_json(filename):
             data = json.load(file)
 
             for product in data['products']:
-                print(f"Название: {product['name']}")
-                print(f"Цена: {product['price']}")
-                print(f"Вес: {product['weight']}")
-
-                if product['available']:
-                    print("В наличии\n")
-                else:
-                    print("Нет в наличии!\n")
+                print_product(product)
 
     except FileNotFoundError:
         print(f"Файл {filename} не найден.")
@@ -26,5 +211,96 @@ def display_products_from_json(filename):
         print(f"Произошла ошибка: {str(e)}")
 
 
-filename = 'products.json'
-display_products_from_json(filename)
\ No newline at end of file
+def stream_products_from_json(filename):
+    """Выводит продукты по мере чтения файла; некорректные записи пропускаются с сообщением"""
+    try:
+        with open(filename, 'r', encoding='utf-8') as file:
+            for product in iter_json_array(file):
+                if isinstance(product, MalformedProduct):
+                    print(f"Пропущен некорректный {product}\n")
+                    continue
+                try:
+                    print_product(product)
+                except (KeyError, TypeError):
+                    print("Пропущен продукт с некорректной структурой\n")
+
+    except FileNotFoundError:
+        print(f"Файл {filename} не найден.")
+    except KeyError:
+        print("Некорректная структура JSON файла.")
+    except Exception as e:
+        print(f"Произошла ошибка: {str(e)}")
+
+
+def generate_catalog(filename, count):
+    """Пишет тестовый каталог из count продуктов, не собирая его в памяти"""
+    with open(filename, 'w', encoding='utf-8') as file:
+        file.write('{\n  "products": [')
+        for number in range(count):
+            product = {"name": f"Продукт {number}", "price": 100 + number % 900,
+                       "available": number % 3 != 0, "weight": 50 + number % 450}
+            file.write(',\n    ' if number else '\n    ')
+            file.write(json.dumps(product, ensure_ascii=False))
+        file.write('\n  ]\n}\n')
+
+
+def measure(filename, mode):
+    """Читает каталог без вывода и печатает замеры одной строкой JSON (запускается в отдельном процессе)"""
+    started = time.perf_counter()
+    first_row = None
+    count = 0
+    if mode == 'stream':
+        with open(filename, 'r', encoding='utf-8') as file:
+            products = iter_json_array(file)
+            for product in products:
+                if first_row is None:
+                    first_row = time.perf_counter() - started
+                count += 1
+    else:
+        with open(filename, 'r', encoding='utf-8') as file:
+            for product in json.load(file)['products']:
+                if first_row is None:
+                    first_row = time.perf_counter() - started
+                count += 1
+    total = time.perf_counter() - started
+    # ru_maxrss в Linux в килобайтах, в macOS в байтах
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+    if sys.platform == 'darwin':
+        peak //= 1024
+    print(json.dumps({'mode': mode, 'count': count, 'first_row': first_row, 'total': total, 'peak_k': peak}))
+
+
+def benchmark(filename, count):
+    """Сравнивает json.load и потоковое чтение: время до первой записи, общее время и пиковую память"""
+    if count:
+        generate_catalog(filename, count)
+    print(f"Файл {filename}: {os.path.getsize(filename) / 2 ** 20:.1f} МБ")
+    print(f"{'режим':<10}{'записей':>10}{'первая, мс':>13}{'всего, с':>10}{'память, МБ':>12}")
+    for mode in ('json.load', 'stream'):
+        # Каждый режим в своем процессе, чтобы пиковая память не смешивалась
+        output = subprocess.run([sys.executable, __file__, filename, '--measure', mode],
+                                capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        first_row = (result['first_row'] or 0) * 1000
+        print(f"{mode:<10}{result['count']:>10}{first_row:>13.1f}{result['total']:>10.2f}"
+              f"{result['peak_k'] / 1024:>12.1f}")
+
+
+def main():
+    args = sys.argv[1:]
+    filename = args[0] if args and not args[0].startswith('--') else 'products.json'
+
+    if '--measure' in args:
+        measure(filename, args[args.index('--measure') + 1])
+    elif '--benchmark' in args:
+        index = args.index('--benchmark') + 1
+        count = int(args[index]) if index < len(args) else 0
+        benchmark(filename, count)
+    elif '--stream' in args:
+        stream_products_from_json(filename)
+    else:
+        display_products_from_json(filename)
+
+
+if __name__ == "__main__":
+    main()
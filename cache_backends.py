@@ -0,0 +1,179 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+import threading
+import time
+import uuid
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class CacheBackend(ABC):
+    """Общий интерфейс кэша: значения с временем жизни и рассылка сообщений об изменениях между копиями бота"""
+
+    @abstractmethod
+    def get(self, key):
+        """Возвращает значение или None, если ключа нет или срок его жизни истек"""
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        """Сохраняет значение; ttl - время жизни в секундах (None - без ограничения)"""
+
+    @abstractmethod
+    def delete(self, key):
+        """Удаляет значение"""
+
+    @abstractmethod
+    def publish(self, kind, data):
+        """Сообщает остальным копиям бота об изменении (например, настроек пользователя)"""
+
+    @abstractmethod
+    def subscribe(self, callback):
+        """Регистрирует callback(kind, data) для сообщений от других копий бота"""
+
+    @abstractmethod
+    def acquire_lock(self, name, ttl):
+        """Захватывает или продлевает на ttl секунд блокировку name; True, если она у этой копии бота.
+
+        Так из нескольких копий бота выбирается одна, которая выполняет фоновую работу.
+        """
+
+
+class LocalCache(CacheBackend):
+    """Кэш в памяти процесса; других копий бота нет, поэтому сообщения никуда не рассылаются"""
+    PURGE_EVERY = 1000  # Раз в сколько записей удалять просроченные значения
+
+    def __init__(self):
+        self.data = {}  # ключ -> (значение, время истечения или None)
+        self.lock = threading.Lock()
+        self.writes = 0
+
+    def get(self, key):
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and time.time() >= expires_at:
+            self.data.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.data[key] = (value, time.time() + ttl if ttl is not None else None)
+            self.writes += 1
+            if self.writes % self.PURGE_EVERY == 0:
+                now = time.time()
+                for stale_key in [k for k, (_, expires_at) in self.data.items()
+                                  if expires_at is not None and now >= expires_at]:
+                    del self.data[stale_key]
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def publish(self, kind, data):
+        pass
+
+    def subscribe(self, callback):
+        pass
+
+    def acquire_lock(self, name, ttl):
+        return True
+
+
+class RedisCache(CacheBackend):
+    """Кэш в Redis, общий для всех копий бота; изменения рассылаются через pub/sub.
+
+    Значения хранятся в JSON, поэтому кортежи возвращаются списками. Если Redis
+    недоступен, ошибка пишется в лог, чтение считается промахом, а запись и рассылка
+    пропускаются: бот продолжает работать, получая цены от WB.
+    """
+
+    def __init__(self, client, prefix='wbbot:'):
+        self.client = client
+        self.prefix = prefix
+        self.channel = f"{prefix}events"
+        self.sender = uuid.uuid4().hex  # Свои сообщения копия бота пропускает
+        self.callbacks = []
+        self.listener = None
+
+    def get(self, key):
+        try:
+            raw = self.client.get(self.prefix + key)
+        except redis.RedisError as e:
+            logger.warning(f"Redis недоступен, чтение {key} считается промахом: {e}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        try:
+            self.client.set(self.prefix + key, json.dumps(value, ensure_ascii=False),
+                            ex=int(ttl) if ttl is not None else None)
+        except redis.RedisError as e:
+            logger.warning(f"Redis недоступен, запись {key} пропущена: {e}")
+
+    def delete(self, key):
+        try:
+            self.client.delete(self.prefix + key)
+        except redis.RedisError as e:
+            logger.warning(f"Redis недоступен, удаление {key} пропущено: {e}")
+
+    def publish(self, kind, data):
+        try:
+            self.client.publish(self.channel, json.dumps({'sender': self.sender, 'kind': kind, 'data': data}))
+        except redis.RedisError as e:
+            logger.warning(f"Redis недоступен, сообщение {kind} не разослано: {e}")
+
+    def acquire_lock(self, name, ttl):
+        key = f"{self.prefix}lock:{name}"
+        try:
+            if self.client.set(key, self.sender, nx=True, ex=int(ttl)):
+                return True
+            # Продление только своей блокировки: WATCH отменит EXPIRE, если ключ сменится после проверки владельца
+            with self.client.pipeline() as pipe:
+                pipe.watch(key)
+                owner = pipe.get(key)
+                if owner is None or (owner.decode() if isinstance(owner, bytes) else owner) != self.sender:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.expire(key, int(ttl))
+                pipe.execute()
+                return True
+        except redis.WatchError:
+            return False
+        except redis.RedisError as e:
+            # Без Redis нельзя узнать, не работает ли уже другая копия, поэтому фоновая работа пропускается
+            logger.warning(f"Redis недоступен, блокировка {name} не получена: {e}")
+            return False
+
+    def subscribe(self, callback):
+        self.callbacks.append(callback)
+        if self.listener is None:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.channel: self._handle_message})
+            self.listener = pubsub.run_in_thread(sleep_time=1, daemon=True)
+
+    def _handle_message(self, message):
+        try:
+            event = json.loads(message['data'])
+            if event['sender'] == self.sender:
+                return
+            for callback in self.callbacks:
+                callback(event['kind'], event['data'])
+        except Exception as e:
+            logger.error(f"Ошибка обработки сообщения кэша: {e}")
+
+
+def create_cache(redis_url=None):
+    """Создает общий кэш в Redis, если указан адрес, иначе кэш в памяти процесса"""
+    if not redis_url:
+        return LocalCache()
+    if redis is None:
+        raise RuntimeError("Для общего кэша нужен пакет redis (pip install redis)")
+    return RedisCache(redis.Redis.from_url(redis_url))
@@ -0,0 +1,346 @@
+"""Индекс словаря на диске для быстрого поиска без загрузки файла в память.
+
+Строится по en-ru.txt или ru-en.txt (строки 'слово - перевод1, перевод2') и
+состоит из заголовка, отсортированной таблицы ключей и пула строк UTF-8.
+Файл открывается через mmap, поэтому запуск не зависит от размера словаря,
+а точный поиск и поиск по префиксу выполняются двоичным поиском за O(log n).
+
+Примеры:
+    python dictionary_index.py build ru-en.txt
+    python dictionary_index.py lookup ru-en.txt.idx дом
+    python dictionary_index.py prefix ru-en.txt.idx до
+    python dictionary_index.py benchmark ru-en.txt
+"""
+import argparse
+import bisect
+import heapq
+import json
+import mmap
+import os
+import random
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import groupby
+
+try:
+    import resource
+except ImportError:  # Windows: пиковую память замерить не получится
+    resource = None
+
+MAGIC = b'DICTIDX1'
+HEADER = struct.Struct('<8sQ')  # сигнатура, число ключей
+ENTRY = struct.Struct('<QQII')  # смещение ключа, смещение значения, длина ключа, длина значения
+RUN_RECORD = struct.Struct('<QII')  # номер строки, длина ключа, длина значения (во временных файлах сортировки)
+RUN_ENTRIES = 1_000_000  # Сколько строк словаря сортировать в памяти до сброса на диск
+
+
+def parse_line(line):
+    """Разбирает строку 'слово - переводы' и возвращает (слово, переводы) или None"""
+    line = line.strip()
+    separator = ' - ' if ' - ' in line else '-'
+    if not line or separator not in line:
+        return None
+    key, value = line.split(separator, 1)
+    return key.strip(), value.strip()
+
+
+def read_dictionary(source):
+    """Читает словарь в dict; повторяющиеся слова объединяются"""
+    entries = {}
+    with open(source, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            parsed = parse_line(line)
+            if parsed is None:
+                continue
+            key, value = parsed
+            entries[key] = f"{entries[key]}, {value}" if key in entries else value
+    return entries
+
+
+def write_run(entries, directory):
+    """Сбрасывает отсортированные (ключ, номер строки, значение) во временный файл и возвращает его путь"""
+    fd, path = tempfile.mkstemp(suffix='.run', dir=directory)
+    with open(fd, 'wb') as f:
+        for key, number, value in sorted(entries):
+            f.write(RUN_RECORD.pack(number, len(key), len(value)))
+            f.write(key)
+            f.write(value)
+    return path
+
+
+def read_run(path):
+    with open(path, 'rb') as f:
+        while True:
+            header = f.read(RUN_RECORD.size)
+            if not header:
+                return
+            number, key_length, value_length = RUN_RECORD.unpack(header)
+            yield f.read(key_length), number, f.read(value_length)
+
+
+def sorted_entries(source, directory, run_entries=RUN_ENTRIES):
+    """Выдает (ключ, переводы) в байтах UTF-8, отсортированные по ключу.
+
+    Строки сортируются блоками по run_entries во временных файлах и сливаются
+    heapq.merge, поэтому словарь не загружается в память целиком. Переводы
+    повторяющихся слов объединяются в порядке строк файла, как в read_dictionary.
+    """
+    runs = []
+    entries = []
+    with open(source, 'r', encoding='utf-8-sig') as f:
+        for number, line in enumerate(f):
+            parsed = parse_line(line)
+            if parsed is None:
+                continue
+            key, value = parsed
+            entries.append((key.encode('utf-8'), number, value.encode('utf-8')))
+            if len(entries) >= run_entries:
+                runs.append(write_run(entries, directory))
+                entries = []
+    if runs:
+        if entries:
+            runs.append(write_run(entries, directory))
+        merged = heapq.merge(*(read_run(run) for run in runs))
+    else:
+        merged = iter(sorted(entries))
+
+    # Повторы одного слова после сортировки идут подряд
+    for key, group in groupby(merged, key=lambda entry: entry[0]):
+        yield key, b', '.join(value for _, _, value in group)
+
+
+def build_index(source, index_file=None, run_entries=RUN_ENTRIES):
+    """Строит индекс по файлу словаря и возвращает путь к нему.
+
+    Ключи сортируются по байтам UTF-8, что совпадает с порядком символов в строках.
+    Таблица ключей и пул строк пишутся за один проход по отсортированным строкам
+    в отдельные временные файлы и затем склеиваются.
+    """
+    index_file = index_file or source + '.idx'
+    tmp = index_file + '.tmp'
+    index_dir = os.path.dirname(os.path.abspath(index_file))
+    with tempfile.TemporaryDirectory(prefix='dict-idx-', dir=index_dir) as directory:
+        table_file = os.path.join(directory, 'table')
+        pool_file = os.path.join(directory, 'pool')
+        count = 0
+        # Смещения в таблице пока отсчитываются от начала пула: его позиция зависит от числа ключей
+        with open(table_file, 'wb') as table, open(pool_file, 'wb') as pool:
+            offset = 0
+            for key, value in sorted_entries(source, directory, run_entries):
+                table.write(ENTRY.pack(offset, offset + len(key), len(key), len(value)))
+                pool.write(key)
+                pool.write(value)
+                offset += len(key) + len(value)
+                count += 1
+
+        pool_start = HEADER.size + ENTRY.size * count
+        with open(tmp, 'wb') as f, open(table_file, 'rb') as table, open(pool_file, 'rb') as pool:
+            f.write(HEADER.pack(MAGIC, count))
+            while True:
+                block = table.read(ENTRY.size * 4096)
+                if not block:
+                    break
+                for key_offset, value_offset, key_length, value_length in ENTRY.iter_unpack(block):
+                    f.write(ENTRY.pack(pool_start + key_offset, pool_start + value_offset, key_length, value_length))
+            shutil.copyfileobj(pool, f)
+    os.replace(tmp, index_file)
+    return index_file
+
+
+class DictionaryIndex:
+    """Словарь, открытый из файла индекса через mmap"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        if os.fstat(self.file.fileno()).st_size < HEADER.size:
+            self.file.close()
+            raise ValueError(f"{path} не является индексом словаря")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} не является индексом словаря")
+        # Пул строк идет в порядке таблицы, поэтому последнее значение заканчивается в конце файла
+        size = len(self.data)
+        end = HEADER.size + ENTRY.size * self.count
+        if self.count and end <= size:
+            _, value_offset, _, value_length = self._entry(self.count - 1)
+            end = value_offset + value_length
+        if end > size:
+            self.close()
+            raise ValueError(f"Индекс {path} поврежден или записан не полностью")
+        self.keys = _Keys(self)
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def _entry(self, number):
+        return ENTRY.unpack_from(self.data, HEADER.size + ENTRY.size * number)
+
+    def _key(self, number):
+        key_offset, _, key_length, _ = self._entry(number)
+        return self.data[key_offset:key_offset + key_length]
+
+    def _item(self, number):
+        key_offset, value_offset, key_length, value_length = self._entry(number)
+        return (self.data[key_offset:key_offset + key_length].decode('utf-8'),
+                self.data[value_offset:value_offset + value_length].decode('utf-8'))
+
+    def get(self, word, default=None):
+        """Возвращает переводы слова или default"""
+        key = word.encode('utf-8')
+        number = bisect.bisect_left(self.keys, key)
+        if number < self.count and self._key(number) == key:
+            return self._item(number)[1]
+        return default
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def prefix_search(self, prefix, limit=None):
+        """Выдает (слово, переводы) для слов, начинающихся с prefix, по алфавиту"""
+        key = prefix.encode('utf-8')
+        number = bisect.bisect_left(self.keys, key)
+        found = 0
+        while number < self.count and (limit is None or found < limit):
+            if not self._key(number).startswith(key):
+                return
+            yield self._item(number)
+            number += 1
+            found += 1
+
+
+class _Keys:
+    """Последовательность ключей индекса для bisect; ключи читаются из mmap по требованию"""
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return self.index.count
+
+    def __getitem__(self, number):
+        return self.index._key(number)
+
+
+def measure(source, mode, words):
+    """Открывает словарь, ищет слова и печатает замеры одной строкой JSON (запускается в отдельном процессе)"""
+    started = time.perf_counter()
+    if mode == 'dict':
+        dictionary = read_dictionary(source)
+    else:
+        dictionary = DictionaryIndex(source)
+    startup = time.perf_counter() - started
+
+    started = time.perf_counter()
+    found = sum(dictionary.get(word) is not None for word in words)
+    lookups = time.perf_counter() - started
+
+    print(json.dumps({'startup': startup, 'lookups': lookups, 'found': found, 'peak_kb': peak_memory_kb()}))
+
+
+def peak_memory_kb():
+    """Пиковая память процесса в килобайтах.
+
+    В Linux берется VmHWM: ru_maxrss сохраняет пик родительского процесса после exec.
+    """
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    if resource is None:
+        return 0
+    # ru_maxrss в Linux в килобайтах, в macOS в байтах
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def benchmark(source, lookups=10000):
+    """Сравнивает загрузку словаря в dict и индекс: время запуска, поиска и пиковую память"""
+    index_file = build_index(source)
+    keys = list(read_dictionary(source))
+    words = random.Random(1).sample(keys, min(lookups, len(keys)))
+    words_file = index_file + '.words'
+    with open(words_file, 'w', encoding='utf-8') as f:
+        json.dump(words, f, ensure_ascii=False)
+
+    print(f"Словарь {source}: {os.path.getsize(source) / 2 ** 20:.1f} МБ, "
+          f"индекс: {os.path.getsize(index_file) / 2 ** 20:.1f} МБ, поисков: {len(words)}")
+    print(f"{'режим':<8}{'запуск, мс':>12}{'поиск, мкс':>12}{'память, МБ':>12}")
+    try:
+        for mode, path in (('dict', source), ('index', index_file)):
+            # Каждый режим в своем процессе, чтобы пиковая память не смешивалась
+            output = subprocess.run([sys.executable, __file__, 'measure', mode, path, words_file],
+                                    capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{mode:<8}{result['startup'] * 1000:>12.1f}"
+                  f"{result['lookups'] / max(len(words), 1) * 1e6:>12.2f}{result['peak_kb'] / 1024:>12.1f}")
+    finally:
+        os.remove(words_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Индекс словаря для быстрого поиска слов")
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help="построить индекс по файлу словаря")
+    build.add_argument('source')
+    build.add_argument('index', nargs='?')
+    lookup = commands.add_parser('lookup', help="найти слово")
+    lookup.add_argument('index')
+    lookup.add_argument('word')
+    prefix = commands.add_parser('prefix', help="найти слова по началу")
+    prefix.add_argument('index')
+    prefix.add_argument('prefix')
+    prefix.add_argument('--limit', type=int, default=20)
+    bench = commands.add_parser('benchmark', help="сравнить индекс с загрузкой словаря в dict")
+    bench.add_argument('source')
+    bench.add_argument('--lookups', type=int, default=10000)
+    measure_parser = commands.add_parser('measure', help="служебная команда для benchmark")
+    measure_parser.add_argument('mode', choices=('dict', 'index'))
+    measure_parser.add_argument('path')
+    measure_parser.add_argument('words')
+    args = parser.parse_args()
+
+    if args.command == 'measure':
+        with open(args.words, encoding='utf-8') as f:
+            measure(args.path, args.mode, json.load(f))
+        return
+
+    try:
+        if args.command == 'build':
+            print(f"Индекс сохранен в {build_index(args.source, args.index)}")
+        elif args.command == 'lookup':
+            with DictionaryIndex(args.index) as index:
+                translation = index.get(args.word)
+                print(f"{args.word} - {translation}" if translation is not None else f"Слово {args.word} не найдено")
+        elif args.command == 'prefix':
+            with DictionaryIndex(args.index) as index:
+                for word, translation in index.prefix_search(args.prefix, args.limit):
+                    print(f"{word} - {translation}")
+        else:
+            benchmark(args.source, args.lookups)
+    except FileNotFoundError as e:
+        print(f"Ошибка: файл {e.filename} не найден")
+    except (ValueError, struct.error) as e:
+        print(f"Ошибка: {e}")
+
+
+if __name__ == '__main__':
+    main()
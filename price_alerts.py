@@ -0,0 +1,549 @@
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_right
+
+import numpy as np
+
+# Коды типов уведомлений для пакетной проверки
+NOTIF_TYPE_CODES = {
+    'any': 0,
+    'increase': 1,
+    'decrease': 2
+}
+NOTIF_TYPE_UNKNOWN = -1
+NOTIF_TYPE_NAMES = {code: name for name, code in NOTIF_TYPE_CODES.items()}
+
+# Значение вместо NULL в числовых столбцах хранилища подписок
+MISSING = -1
+
+
+def is_price_change_triggered(old_price, new_price, threshold, notif_type):
+    """Проверяет изменение цены для одной подписки"""
+    if old_price == 0:
+        return False
+
+    change_percent = abs((new_price - old_price) / old_price * 100)
+
+    if change_percent < threshold:
+        return False
+
+    if notif_type == 'any':
+        return True
+    elif notif_type == 'increase' and new_price > old_price:
+        return True
+    elif notif_type == 'decrease' and new_price < old_price:
+        return True
+
+    return False
+
+
+def notif_type_code(notif_type):
+    """Возвращает числовой код типа уведомлений"""
+    return NOTIF_TYPE_CODES.get(notif_type, NOTIF_TYPE_UNKNOWN)
+
+
+def evaluate_price_changes(old_prices, new_prices, thresholds, notif_codes):
+    """Пакетная проверка изменений цен за цикл.
+
+    Принимает массивы старых и новых цен, порогов и кодов типов уведомлений
+    одинаковой длины и возвращает индексы подписок, по которым нужно
+    отправить уведомление. Результат совпадает с is_price_change_triggered.
+    """
+    old_prices = np.asarray(old_prices, dtype=np.int64)
+    new_prices = np.asarray(new_prices, dtype=np.int64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    notif_codes = np.asarray(notif_codes, dtype=np.int8)
+
+    valid = old_prices != 0
+    safe_old = np.where(valid, old_prices, 1)
+    with np.errstate(invalid='ignore'):
+        change_percent = np.abs((new_prices - old_prices) / safe_old * 100)
+        passed = valid & (change_percent >= thresholds)
+
+    direction_ok = (
+        (notif_codes == NOTIF_TYPE_CODES['any'])
+        | ((notif_codes == NOTIF_TYPE_CODES['increase']) & (new_prices > old_prices))
+        | ((notif_codes == NOTIF_TYPE_CODES['decrease']) & (new_prices < old_prices))
+    )
+
+    return np.flatnonzero(passed & direction_ok)
+
+
+def _trigger_bound(old_price, threshold, notif_type):
+    """Ближайшая к old_price цена, при которой срабатывает подписка с данным порогом и направлением"""
+    step = -1 if notif_type == 'decrease' else 1
+    price = int(old_price * (1 + step * threshold / 100))
+    # Уточняем границу той же формулой, что и построчная проверка
+    while is_price_change_triggered(old_price, price - step, threshold, notif_type):
+        price -= step
+    while not is_price_change_triggered(old_price, price, threshold, notif_type):
+        price += step
+    return price
+
+
+class TriggerIndex:
+    """Индекс границ срабатывания уведомлений по артикулам.
+
+    Для каждого артикула хранит начальную цену и подписчиков, отсортированных
+    по порогу отдельно для падения и роста цены, а также границы "тихой"
+    полосы: самую высокую цену, при которой срабатывает хотя бы один
+    подписчик на падение, и самую низкую - для подписчиков на рост.
+    Новая цена внутри полосы проверяется одним сравнением. Подписчики на
+    любое изменение с нулевым порогом срабатывают и при неизменной цене,
+    как в построчной проверке, поэтому полосы у таких артикулов нет.
+    """
+
+    def __init__(self):
+        self.articles = {}
+        self.chat_articles = {}
+        self.lock = threading.Lock()
+
+    def _entry(self, article):
+        return self.articles.setdefault(article, {
+            'initial_price': None,
+            'subscribers': {},
+            'decrease': [],
+            'increase': [],
+            'lower': None,
+            'upper': None,
+            'always': set()
+        })
+
+    def _rebuild(self, entry):
+        entry['decrease'] = sorted(
+            (threshold, chat_id) for chat_id, (threshold, notif_type) in entry['subscribers'].items()
+            if threshold is not None and notif_type in ('any', 'decrease')
+        )
+        entry['increase'] = sorted(
+            (threshold, chat_id) for chat_id, (threshold, notif_type) in entry['subscribers'].items()
+            if threshold is not None and notif_type in ('any', 'increase')
+        )
+
+        entry['always'] = {
+            chat_id for chat_id, (threshold, notif_type) in entry['subscribers'].items()
+            if threshold is not None and threshold <= 0 and notif_type == 'any'
+        }
+
+        old_price = entry['initial_price']
+        entry['lower'] = entry['upper'] = None
+        if not old_price:
+            return
+        if entry['decrease']:
+            entry['lower'] = _trigger_bound(old_price, entry['decrease'][0][0], 'decrease')
+        if entry['increase']:
+            entry['upper'] = _trigger_bound(old_price, entry['increase'][0][0], 'increase')
+
+    def set_initial_price(self, article, price):
+        with self.lock:
+            entry = self._entry(article)
+            if entry['initial_price'] != price:
+                entry['initial_price'] = price
+                self._rebuild(entry)
+
+    def load(self, rows):
+        """Массовая загрузка строк (артикул, chat_id, порог, тип уведомлений, начальная цена).
+
+        Подписчики сначала только добавляются, а границы каждого артикула пересчитываются один раз в конце.
+        """
+        with self.lock:
+            touched = set()
+            for article, chat_id, threshold, notif_type, initial_price in rows:
+                entry = self._entry(article)
+                entry['subscribers'][chat_id] = (threshold, notif_type)
+                entry['initial_price'] = initial_price
+                self.chat_articles.setdefault(chat_id, set()).add(article)
+                touched.add(article)
+            for article in touched:
+                self._rebuild(self.articles[article])
+
+    def add_subscription(self, article, chat_id, threshold, notif_type):
+        with self.lock:
+            entry = self._entry(article)
+            entry['subscribers'][chat_id] = (threshold, notif_type)
+            self.chat_articles.setdefault(chat_id, set()).add(article)
+            self._rebuild(entry)
+
+    def remove_subscription(self, article, chat_id):
+        with self.lock:
+            entry = self.articles.get(article)
+            if entry is not None and entry['subscribers'].pop(chat_id, None) is not None:
+                if entry['subscribers']:
+                    self._rebuild(entry)
+                else:
+                    del self.articles[article]
+            self.chat_articles.get(chat_id, set()).discard(article)
+
+    def update_chat_settings(self, chat_id, threshold, notif_type):
+        with self.lock:
+            for article in self.chat_articles.get(chat_id, ()):
+                entry = self.articles[article]
+                entry['subscribers'][chat_id] = (threshold, notif_type)
+                self._rebuild(entry)
+
+    def remove_chat(self, chat_id):
+        for article in list(self.chat_articles.get(chat_id, ())):
+            self.remove_subscription(article, chat_id)
+        with self.lock:
+            self.chat_articles.pop(chat_id, None)
+
+    def has_article(self, article):
+        return article in self.articles
+
+    def has_subscription(self, article, chat_id):
+        with self.lock:
+            entry = self.articles.get(article)
+            return entry is not None and chat_id in entry['subscribers']
+
+    def is_in_band(self, article, new_price):
+        """True, если новая цена не вызывает ни одного уведомления"""
+        with self.lock:
+            entry = self.articles.get(article)
+            if entry is None:
+                return False
+            if not entry['initial_price']:
+                return True
+            if entry['always']:
+                return False
+            lower = entry['lower'] if entry['lower'] is not None else float('-inf')
+            upper = entry['upper'] if entry['upper'] is not None else float('inf')
+            return lower < new_price < upper
+
+    def crossed(self, article, new_price):
+        """Подписчики, чья граница пересечена новой ценой, или None, если артикул не проиндексирован"""
+        with self.lock:
+            entry = self.articles.get(article)
+            if entry is None:
+                return None
+            old_price = entry['initial_price']
+            if not old_price:
+                return set()
+            if new_price == old_price:
+                return set(entry['always'])
+
+            change_percent = abs((new_price - old_price) / old_price * 100)
+            subscribers = entry['decrease'] if new_price < old_price else entry['increase']
+            count = bisect_right(subscribers, (change_percent, float('inf')))
+            return {chat_id for _, chat_id in subscribers[:count]}
+
+
+class SubscriptionStore:
+    """Компактное хранилище подписок для цикла проверки цен.
+
+    Данные товаров и пользователей хранятся один раз в столбцах array,
+    валюты интернированы в однобайтовые коды, а связь артикул -> подписчики
+    хранится в формате CSR: подписчики товара с номером slot - это
+    sub_chats[offsets[slot]:offsets[slot + 1]]. Добавления и удаления
+    копятся отдельно и вливаются в CSR при compact().
+    """
+
+    COMPACT_RATIO = 0.1  # Доля накопленных изменений, после которой CSR перестраивается
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+        # Товары
+        self.article_slots = {}
+        self.article_ids = array('q')
+        self.initial_prices = array('q')
+        self.current_prices = array('q')
+        self.unavailable = bytearray()
+        self.names = []
+
+        # Пользователи
+        self.chat_slots = {}
+        self.chat_ids = array('q')
+        self.thresholds = array('h')
+        self.notif_codes = array('b')
+        self.currency_codes = array('B')
+        self.digest_intervals = array('h')
+        self.chat_active = bytearray()
+        self.currencies = []
+        self.currency_slots = {}
+
+        # Связь товар -> подписчики
+        self.offsets = array('q', [0])
+        self.sub_chats = array('i')
+        self.added = {}
+        self.removed = set()
+        self.changes = 0
+
+    @staticmethod
+    def _pack(value):
+        return MISSING if value is None else value
+
+    @staticmethod
+    def _unpack(value):
+        return None if value == MISSING else value
+
+    def _currency_code(self, currency):
+        if currency not in self.currency_slots:
+            self.currency_slots[currency] = len(self.currencies)
+            self.currencies.append(currency)
+        return self.currency_slots[currency]
+
+    def _article_slot(self, article):
+        slot = self.article_slots.get(article)
+        if slot is None:
+            slot = self.article_slots[article] = len(self.article_ids)
+            self.article_ids.append(article)
+            self.initial_prices.append(MISSING)
+            self.current_prices.append(MISSING)
+            self.unavailable.append(0)
+            self.names.append('')
+            self.offsets.append(self.offsets[-1])
+        return slot
+
+    def _chat_slot(self, chat_id):
+        slot = self.chat_slots.get(chat_id)
+        if slot is None:
+            slot = self.chat_slots[chat_id] = len(self.chat_ids)
+            self.chat_ids.append(chat_id)
+            self.thresholds.append(MISSING)
+            self.notif_codes.append(NOTIF_TYPE_UNKNOWN)
+            self.currency_codes.append(self._currency_code(None))
+            self.digest_intervals.append(MISSING)
+            self.chat_active.append(1)
+        return slot
+
+    def _set_article(self, article, name, initial_price, current_price, unavailable):
+        slot = self._article_slot(article)
+        self.names[slot] = sys.intern(name)
+        self.initial_prices[slot] = self._pack(initial_price)
+        self.current_prices[slot] = self._pack(current_price)
+        self.unavailable[slot] = 1 if unavailable else 0
+        return slot
+
+    def _set_chat(self, chat_id, threshold, notif_type, currency, digest_interval):
+        slot = self._chat_slot(chat_id)
+        self.thresholds[slot] = self._pack(threshold)
+        self.notif_codes[slot] = notif_type_code(notif_type)
+        self.currency_codes[slot] = self._currency_code(currency)
+        self.digest_intervals[slot] = self._pack(digest_interval)
+        return slot
+
+    def load(self, rows):
+        """Заполняет хранилище строками подписок (словари как в запросе проверки цен)"""
+        with self.lock:
+            pairs = []
+            for row in rows:
+                article_slot = self._set_article(
+                    row['articule'], row['name'], row['initial_price'], row['curent_price'],
+                    row['unavailable_since'] is not None
+                )
+                chat_slot = self._set_chat(
+                    row['chat_id'], row['treshold_percent'], row['notification_type'],
+                    row['currency'], row['digest_interval']
+                )
+                pairs.append((article_slot, chat_slot))
+            self._build_csr(pairs)
+
+    def _build_csr(self, pairs):
+        pairs.sort()
+        offsets = array('q', [0] * (len(self.article_ids) + 1))
+        for article_slot, _ in pairs:
+            offsets[article_slot + 1] += 1
+        for slot in range(len(self.article_ids)):
+            offsets[slot + 1] += offsets[slot]
+        self.offsets = offsets
+        self.sub_chats = array('i', (chat_slot for _, chat_slot in pairs))
+        self.added = {}
+        self.removed = set()
+        self.changes = 0
+
+    def _in_csr(self, article_slot, chat_slot):
+        start, end = self.offsets[article_slot], self.offsets[article_slot + 1]
+        return chat_slot in self.sub_chats[start:end]
+
+    def _subscriber_slots(self, article_slot):
+        start, end = self.offsets[article_slot], self.offsets[article_slot + 1]
+        slots = [
+            chat_slot for chat_slot in self.sub_chats[start:end]
+            if (article_slot, chat_slot) not in self.removed
+        ]
+        slots.extend(self.added.get(article_slot, ()))
+        return [chat_slot for chat_slot in slots if self.chat_active[chat_slot]]
+
+    def _compact(self):
+        pairs = [
+            (article_slot, chat_slot)
+            for article_slot in range(len(self.article_ids))
+            for chat_slot in self._subscriber_slots(article_slot)
+        ]
+        self._build_csr(pairs)
+
+    def compact(self):
+        """Вливает накопленные изменения в CSR"""
+        with self.lock:
+            self._compact()
+
+    def _changed(self):
+        self.changes += 1
+        if self.changes > max(len(self.sub_chats), 1000) * self.COMPACT_RATIO:
+            self._compact()
+
+    def add_subscription(self, article, name, initial_price, chat_id, threshold, notif_type, currency,
+                         digest_interval):
+        with self.lock:
+            article_slot = self.article_slots.get(article)
+            if article_slot is None:
+                article_slot = self._set_article(article, name, initial_price, initial_price, False)
+            chat_slot = self.chat_slots.get(chat_id)
+            if chat_slot is not None and not self.chat_active[chat_slot]:
+                # Старые связи отключенного пользователя вычищаются, прежде чем он снова станет активным
+                self._compact()
+                self.chat_active[chat_slot] = 1
+            chat_slot = self._set_chat(chat_id, threshold, notif_type, currency, digest_interval)
+            if chat_slot in self._subscriber_slots(article_slot):
+                return
+            # Отменяется только действительно записанное удаление связи из CSR
+            if (article_slot, chat_slot) in self.removed:
+                self.removed.discard((article_slot, chat_slot))
+            else:
+                self.added.setdefault(article_slot, []).append(chat_slot)
+            self._changed()
+
+    def remove_subscription(self, article, chat_id):
+        with self.lock:
+            article_slot = self.article_slots.get(article)
+            chat_slot = self.chat_slots.get(chat_id)
+            if article_slot is None or chat_slot is None:
+                return
+            added = self.added.get(article_slot, [])
+            if chat_slot in added:
+                added.remove(chat_slot)
+            elif self._in_csr(article_slot, chat_slot) and (article_slot, chat_slot) not in self.removed:
+                self.removed.add((article_slot, chat_slot))
+            else:
+                return  # Такой подписки нет: повтор удаления ничего не меняет
+            self._changed()
+
+    def remove_chat(self, chat_id):
+        with self.lock:
+            chat_slot = self.chat_slots.get(chat_id)
+            if chat_slot is not None:
+                self.chat_active[chat_slot] = 0
+                self._changed()
+
+    def update_chat(self, chat_id, threshold, notif_type, currency, digest_interval):
+        with self.lock:
+            if chat_id in self.chat_slots:
+                self._set_chat(chat_id, threshold, notif_type, currency, digest_interval)
+
+    def set_initial_price(self, article, price):
+        with self.lock:
+            if article in self.article_slots:
+                self.initial_prices[self.article_slots[article]] = self._pack(price)
+
+    def set_current_price(self, article, price):
+        with self.lock:
+            if article in self.article_slots:
+                self.current_prices[self.article_slots[article]] = self._pack(price)
+
+    def set_unavailable(self, article, unavailable):
+        with self.lock:
+            if article in self.article_slots:
+                self.unavailable[self.article_slots[article]] = 1 if unavailable else 0
+
+    def subscription_count(self):
+        with self.lock:
+            return len(self.sub_chats) - len(self.removed) + sum(len(v) for v in self.added.values())
+
+    def iter_batches(self, batch_size, start_article=None):
+        """Выдает подписки порциями в виде строк, совместимых с запросом проверки цен.
+
+        Обход начинается с товара start_article и идет по кругу, чтобы прерванная
+        проверка продолжалась с того же места. Вместо времени unavailable_since
+        в строках хранится признак True.
+        """
+        start = self.article_slots.get(start_article, 0)
+        article_slot, stop = start, None  # stop is None: первый проход до конца столбцов
+        while True:
+            batch = []
+            with self.lock:
+                while len(batch) < batch_size:
+                    if article_slot >= (len(self.article_ids) if stop is None else stop):
+                        if stop is not None or start == 0:
+                            break
+                        article_slot, stop = 0, start
+                        continue
+                    for chat_slot in self._subscriber_slots(article_slot):
+                        batch.append({
+                            'articule': self.article_ids[article_slot],
+                            'name': self.names[article_slot],
+                            'curent_price': self._unpack(self.current_prices[article_slot]),
+                            'initial_price': self._unpack(self.initial_prices[article_slot]),
+                            'unavailable_since': True if self.unavailable[article_slot] else None,
+                            'chat_id': self.chat_ids[chat_slot],
+                            'currency': self.currencies[self.currency_codes[chat_slot]],
+                            'treshold_percent': self._unpack(self.thresholds[chat_slot]),
+                            'notification_type': NOTIF_TYPE_NAMES.get(self.notif_codes[chat_slot]),
+                            'digest_interval': self._unpack(self.digest_intervals[chat_slot])
+                        })
+                    article_slot += 1
+            if not batch:
+                return
+            yield batch
+
+    def count_subscriptions(self, after_article, until_article=None):
+        """Число подписок у товаров после after_article и до until_article в порядке обхода iter_batches"""
+        with self.lock:
+            count = len(self.article_ids)
+            if after_article not in self.article_slots:
+                return 0
+            stop = self.article_slots.get(until_article, 0)
+            slot = (self.article_slots[after_article] + 1) % count
+            total = 0
+            while slot != stop:
+                total += len(self._subscriber_slots(slot))
+                slot = (slot + 1) % count
+            return total
+
+    def memory_usage(self):
+        """Примерный объем памяти хранилища в байтах"""
+        with self.lock:
+            columns = (
+                self.article_ids, self.initial_prices, self.current_prices, self.chat_ids,
+                self.thresholds, self.notif_codes, self.currency_codes, self.digest_intervals,
+                self.offsets, self.sub_chats
+            )
+            total = sum(sys.getsizeof(column) for column in columns)
+            total += sys.getsizeof(self.unavailable) + sys.getsizeof(self.chat_active)
+            total += sys.getsizeof(self.article_slots) + sys.getsizeof(self.chat_slots)
+            total += sys.getsizeof(self.names) + sum(sys.getsizeof(name) for name in set(self.names))
+            total += sys.getsizeof(self.removed) + sys.getsizeof(self.added)
+            return total
+
+
+def benchmark(size=200_000, repeat=5, seed=42):
+    """Сравнивает построчную и пакетную проверку на случайных данных"""
+    rng = np.random.default_rng(seed)
+    old_prices = rng.integers(0, 20_000, size)
+    new_prices = (old_prices * rng.uniform(0.7, 1.3, size)).astype(np.int64)
+    thresholds = rng.choice([1, 3, 5, 10, 25, 50], size)
+    notif_types = rng.choice(list(NOTIF_TYPE_CODES), size)
+    notif_codes = np.array([notif_type_code(t) for t in notif_types], dtype=np.int8)
+
+    rows = list(zip(old_prices.tolist(), new_prices.tolist(), thresholds.tolist(), notif_types.tolist()))
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        expected = [i for i, row in enumerate(rows) if is_price_change_triggered(*row)]
+    row_time = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        indices = evaluate_price_changes(old_prices, new_prices, thresholds, notif_codes)
+    batch_time = (time.perf_counter() - start) / repeat
+
+    if indices.tolist() != expected:
+        raise AssertionError("Результаты пакетной и построчной проверки различаются")
+
+    print(f"Подписок: {size}, уведомлений: {len(expected)}")
+    print(f"Построчно: {row_time * 1000:.1f} мс")
+    print(f"Пакетно: {batch_time * 1000:.1f} мс (x{row_time / batch_time:.1f})")
+
+
+if __name__ == '__main__':
+    benchmark()
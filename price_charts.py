@@ -0,0 +1,128 @@
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFont
+
+CHART_WIDTH = 640
+CHART_HEIGHT = 240
+CHART_PADDING = 36
+CHART_BACKGROUND = (255, 255, 255)
+CHART_LINE = (203, 17, 171)
+CHART_FILL = (246, 220, 242)
+CHART_TEXT = (90, 90, 90)
+
+
+def render_sparkline(points, since, until, width=CHART_WIDTH, height=CHART_HEIGHT):
+    """Рисует ступенчатый график цены и возвращает PNG.
+
+    points - список (время в секундах, цена) по возрастанию времени; цена
+    держится до следующей точки, последняя - до until.
+    """
+    image = Image.new('RGB', (width, height), CHART_BACKGROUND)
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default()
+
+    prices = [price for _, price in points]
+    low, high = min(prices), max(prices)
+    span = (high - low) or 1
+    left, right = CHART_PADDING, width - CHART_PADDING
+    top, bottom = CHART_PADDING // 2, height - CHART_PADDING
+
+    def x(ts):
+        return left + (min(max(ts, since), until) - since) / ((until - since) or 1) * (right - left)
+
+    def y(price):
+        return bottom - (price - low) / span * (bottom - top)
+
+    line = []
+    for (ts, price), next_ts in zip(points, [ts for ts, _ in points[1:]] + [until]):
+        line.append((x(ts), y(price)))
+        line.append((x(next_ts), y(price)))
+
+    draw.polygon(line + [(line[-1][0], bottom), (line[0][0], bottom)], fill=CHART_FILL)
+    draw.line(line, fill=CHART_LINE, width=3)
+
+    # Подписи только из цифр: встроенный шрифт Pillow не содержит кириллицы
+    draw.text((4, y(high) - 6), str(high), fill=CHART_TEXT, font=font)
+    if low != high:
+        draw.text((4, y(low) - 6), str(low), fill=CHART_TEXT, font=font)
+    draw.text((right - 24, line[-1][1] - 16), str(prices[-1]), fill=CHART_LINE, font=font)
+    draw.text((left, bottom + 8), datetime.fromtimestamp(since).strftime('%d.%m'), fill=CHART_TEXT, font=font)
+    draw.text((right - 30, bottom + 8), datetime.fromtimestamp(until).strftime('%d.%m'), fill=CHART_TEXT, font=font)
+
+    buffer = BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+class ChartCache:
+    """Ограниченный LRU-кэш отрисованных графиков на диске и file_id уже загруженных в Telegram картинок.
+
+    Ключ - кортеж (артикул, валюта, дней, версия), где версия - время последнего
+    изменения цены, поэтому новая цена сама делает старый график ненужным.
+    """
+
+    def __init__(self, directory, max_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # ключ -> file_id или None, если картинка еще не загружалась
+        self.lock = threading.Lock()
+
+        # Картинки, отрисованные до перезапуска, остаются в кэше; file_id придется получить заново
+        if os.path.isdir(directory):
+            files = sorted(
+                (entry for entry in os.scandir(directory) if entry.name.endswith('.png')),
+                key=lambda entry: entry.stat().st_mtime
+            )
+            for entry in files:
+                key = self._parse_filename(entry.name)
+                if key is not None:
+                    self.entries[key] = None
+            self._evict()
+
+    @staticmethod
+    def _parse_filename(filename):
+        parts = filename[:-len('.png')].split('_')
+        if len(parts) != 4 or not all(part.isdigit() for i, part in enumerate(parts) if i != 1):
+            return None
+        article, currency, days, version = parts
+        return int(article), currency, int(days), int(version)
+
+    def path(self, key):
+        return os.path.join(self.directory, '_'.join(str(part) for part in key) + '.png')
+
+    def _evict(self):
+        while len(self.entries) > self.max_entries:
+            key, _ = self.entries.popitem(last=False)
+            try:
+                os.remove(self.path(key))
+            except OSError:
+                pass
+
+    def get(self, key):
+        """Возвращает (file_id, путь к PNG) или None, если графика нет"""
+        with self.lock:
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+            return self.entries[key], self.path(key)
+
+    def put(self, key, png):
+        """Сохраняет отрисованный график и возвращает путь к файлу"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key)
+        with open(path, 'wb') as f:
+            f.write(png)
+        with self.lock:
+            self.entries[key] = None
+            self.entries.move_to_end(key)
+            self._evict()
+        return path
+
+    def set_file_id(self, key, file_id):
+        with self.lock:
+            if key in self.entries:
+                self.entries[key] = file_id
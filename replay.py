@@ -0,0 +1,238 @@
+"""Воспроизведение обновлений Telegram для замера производительности обработчиков bot.py.
+
+Обновления берутся из файла JSONL, который пишет бот с переменной окружения
+BOT_RECORD_UPDATES, или генерируются (--synthetic). Telegram и API WB
+подменяются локальным HTTP-сервером с настраиваемой задержкой. База данных
+остается настоящей (key_to_db.config), поэтому запускать стоит на тестовой базе.
+
+Примеры:
+    python replay.py updates.jsonl --speed 10
+    python replay.py --synthetic 200 --tg-latency 50 --wb-latency 200
+"""
+import argparse
+import json
+import math
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeEndpoints(BaseHTTPRequestHandler):
+    """Отвечает на запросы к Bot API и к API карточек WB"""
+    tg_latency = 0
+    wb_latency = 0
+    message_ids = iter(range(1, 1 << 62))
+
+    def do_GET(self):
+        self.handle_request()
+
+    def do_POST(self):
+        self.handle_request()
+
+    def handle_request(self):
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        length = int(self.headers.get('Content-Length') or 0)
+        if length and 'form-urlencoded' in self.headers.get('Content-Type', ''):
+            body = self.rfile.read(length).decode('utf-8')
+            params.update({key: values[0] for key, values in parse_qs(body).items()})
+        elif length:
+            self.rfile.read(length)
+
+        if url.path.startswith('/wb'):
+            time.sleep(self.wb_latency)
+            payload = self.wb_response(int(params.get('nm', 0)))
+        else:
+            time.sleep(self.tg_latency)
+            payload = {'ok': True, 'result': self.telegram_result(url.path.rsplit('/', 1)[-1], params)}
+
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    @staticmethod
+    def wb_response(article):
+        # Цена зависит от артикула и немного колеблется, чтобы проверки находили изменения
+        price = 500 + article % 5000 + random.randint(-20, 20)
+        return {'data': {'products': [{'name': f"Товар {article}", 'salePriceU': price * 100}]}}
+
+    def telegram_result(self, method, params):
+        if method == 'getMe':
+            return {'id': 1, 'is_bot': True, 'first_name': 'replay', 'username': 'replay_bot'}
+        if method.startswith(('send', 'edit')):
+            message = {
+                'message_id': int(params.get('message_id') or next(self.message_ids)),
+                'date': int(time.time()),
+                'chat': {'id': int(params.get('chat_id', 0)), 'type': 'private'},
+                'text': params.get('text', '')
+            }
+            if method in ('sendPhoto', 'editMessageMedia'):
+                message['photo'] = [{'file_id': f"photo{message['message_id']}", 'file_unique_id': 'u',
+                                     'width': 1, 'height': 1}]
+            return message
+        return True
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_endpoints(tg_latency, wb_latency):
+    """Запускает подменный сервер в отдельном потоке и возвращает его порт"""
+    FakeEndpoints.tg_latency = tg_latency
+    FakeEndpoints.wb_latency = wb_latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeEndpoints)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def read_records(path):
+    """Читает записанные обновления: строки {'ts', 'update'} или сами обновления"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if 'update' in record:
+                    yield record.get('ts'), record['update']
+                else:
+                    yield None, record
+
+
+def synthetic_records(users, seed=1):
+    """Генерирует типичные сессии пользователей, перемешанные между собой"""
+    rng = random.Random(seed)
+    sessions = []
+    for user in range(users):
+        chat_id = 10_000_000 + user
+        article = rng.randint(1_000_000, 300_000_000)
+        sessions.append([
+            ('text', chat_id, '/start'),
+            ('callback', chat_id, 'add_product'),
+            ('text', chat_id, f"https://www.wildberries.ru/catalog/{article}/detail.aspx"),
+            ('callback', chat_id, 'my_products'),
+            ('callback', chat_id, f"product_{article}"),
+            ('callback', chat_id, f"check_{article}"),
+            ('callback', chat_id, 'settings'),
+            ('callback', chat_id, 'change_threshold'),
+            ('callback', chat_id, f"set_threshold_{rng.choice([3, 5, 10])}"),
+            ('callback', chat_id, 'main_menu'),
+        ] + ([('callback', chat_id, f"delete_{article}")] if rng.random() < 0.3 else []))
+
+    update_id = 0
+    while sessions:
+        session = rng.choice(sessions)
+        kind, chat_id, value = session.pop(0)
+        if not session:
+            sessions.remove(session)
+        update_id += 1
+        user = {'id': chat_id, 'is_bot': False, 'first_name': f"User{chat_id}"}
+        message = {'message_id': update_id, 'date': int(time.time()), 'chat': {'id': chat_id, 'type': 'private'},
+                   'from': user}
+        if kind == 'text':
+            message['text'] = value
+            if value.startswith('/'):
+                message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(value)}]
+            yield None, {'update_id': update_id, 'message': message}
+        else:
+            message['text'] = 'menu'
+            yield None, {'update_id': update_id, 'callback_query': {
+                'id': str(update_id), 'from': user, 'message': message, 'chat_instance': '1', 'data': value
+            }}
+
+
+def update_kind(update):
+    """Название группы обновления для отчета: команда, текст, кнопка или изменение статуса чата"""
+    if 'callback_query' in update:
+        data = update['callback_query'].get('data', '')
+        prefix, _, suffix = data.rpartition('_')
+        return 'callback:' + (prefix if prefix and suffix.isdigit() else data)
+    if 'message' in update:
+        text = update['message'].get('text', '')
+        return text.split()[0] if text.startswith('/') else 'message'
+    if 'my_chat_member' in update:
+        return 'my_chat_member'
+    return 'other'
+
+
+def percentile(sorted_values, share):
+    """Процентиль по методу ближайшего ранга"""
+    index = max(0, min(len(sorted_values) - 1, math.ceil(share * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def replay(records, bot_module, speed=0):
+    """Передает обновления обработчикам бота и возвращает задержки по группам"""
+    from telebot import types
+
+    latencies = {}
+    errors = 0
+    first_ts = None
+    start_time = time.perf_counter()
+    for ts, raw_update in records:
+        # Соблюдаем исходные интервалы между обновлениями, ускоренные в speed раз
+        if speed and ts is not None:
+            if first_ts is None:
+                first_ts = ts
+            delay = (ts - first_ts) / speed - (time.perf_counter() - start_time)
+            if delay > 0:
+                time.sleep(delay)
+
+        update = types.Update.de_json(raw_update)
+        started = time.perf_counter()
+        try:
+            bot_module.bot.process_new_updates([update])
+        except Exception as e:
+            errors += 1
+            print(f"Ошибка при обработке обновления {raw_update.get('update_id')}: {e}")
+        latencies.setdefault(update_kind(raw_update), []).append(time.perf_counter() - started)
+    return latencies, errors, time.perf_counter() - start_time
+
+
+def print_report(latencies, errors, elapsed):
+    total = sum(len(values) for values in latencies.values())
+    print(f"Обновлений: {total}, ошибок: {errors}, время: {elapsed:.2f} с, "
+          f"пропускная способность: {total / elapsed if elapsed else 0:.1f} обн/с")
+    print(f"{'группа':<28}{'кол-во':>8}{'p50, мс':>10}{'p90, мс':>10}{'p99, мс':>10}{'max, мс':>10}")
+    rows = sorted(latencies.items(), key=lambda item: -len(item[1]))
+    rows.append(('всего', [value for values in latencies.values() for value in values]))
+    for kind, values in rows:
+        values = sorted(values)
+        if not values:
+            continue
+        print(f"{kind:<28}{len(values):>8}" + "".join(
+            f"{percentile(values, share) * 1000:>10.1f}" for share in (0.5, 0.9, 0.99, 1.0)
+        ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воспроизведение обновлений Telegram через обработчики bot.py")
+    parser.add_argument('path', nargs='?', help="файл JSONL с записанными обновлениями")
+    parser.add_argument('--synthetic', type=int, metavar='USERS', help="сгенерировать сессии для USERS пользователей")
+    parser.add_argument('--speed', type=float, default=0,
+                        help="ускорение относительно записанных интервалов (0 - без пауз)")
+    parser.add_argument('--tg-latency', type=float, default=0, help="задержка ответов Telegram, мс")
+    parser.add_argument('--wb-latency', type=float, default=0, help="задержка ответов API WB, мс")
+    args = parser.parse_args()
+    if not args.path and not args.synthetic:
+        parser.error("укажите файл с обновлениями или --synthetic")
+
+    port = start_fake_endpoints(args.tg_latency / 1000, args.wb_latency / 1000)
+    os.environ['BOT_WB_API_URL'] = f"http://127.0.0.1:{port}/wb/detail"
+    os.environ['BOT_BACKGROUND_JOBS'] = '0'
+    os.environ.pop('BOT_RECORD_UPDATES', None)
+
+    import bot as bot_module
+    from telebot import apihelper
+    apihelper.API_URL = f"http://127.0.0.1:{port}/bot{{0}}/{{1}}"
+
+    records = read_records(args.path) if args.path else synthetic_records(args.synthetic)
+    print_report(*replay(records, bot_module, args.speed))
+
+
+if __name__ == '__main__':
+    main()
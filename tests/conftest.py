@@ -0,0 +1,145 @@
+import os
+import re
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Модули проекта лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeDatabase:
+    """Поддельный MySQL для bot.py: запоминает запросы и отвечает заданными строками.
+
+    Ответ - список строк, число затронутых строк или функция params -> одно из них.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.hosts = []  # Хост каждого запроса из queries: основная база или реплика
+        self.responses = []
+
+    def respond(self, pattern, result):
+        self.responses.insert(0, (re.compile(pattern, re.S), result))
+
+    def run(self, query, params, host):
+        self.queries.append((' '.join(query.split()), params))
+        self.hosts.append(host)
+        for pattern, result in self.responses:
+            if pattern.search(query):
+                return result(params) if callable(result) else result
+        return [{'cnt': 0}] if 'COUNT(*)' in query else []
+
+    def connect(self, *args, **kwargs):
+        return FakeConnection(self, kwargs.get('host'))
+
+
+class FakeCursor:
+    def __init__(self, database, host):
+        self.database = database
+        self.host = host
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = 0
+
+    def execute(self, query, params=()):
+        result = self.database.run(query, params, self.host)
+        if isinstance(result, int):
+            self.rows, self.rowcount = [], result
+        else:
+            self.rows, self.rowcount = list(result), len(result)
+        return self.rowcount
+
+    def executemany(self, query, params_list):
+        for params in params_list:
+            self.execute(query, params)
+
+    def fetchall(self):
+        return list(self.rows)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class FakeConnection:
+    open = True
+
+    def __init__(self, database, host):
+        self.database = database
+        self.host = host
+
+    def cursor(self, *args):
+        return FakeCursor(self.database, self.host)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def begin(self):
+        pass
+
+    def ping(self, reconnect=True):
+        pass
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+@pytest.fixture(scope='session')
+def bot_env(tmp_path_factory):
+    """bot.py, импортированный с поддельной БД, без фоновых проверок и без Redis"""
+    import pymysql
+
+    directory = tmp_path_factory.mktemp('bot')
+    (directory / 'key.config').write_text('123456:TEST')
+    (directory / 'key_to_db.config').write_text('password\n')
+    database = FakeDatabase()
+    patch = pytest.MonkeyPatch()
+    patch.chdir(directory)
+    patch.setattr(pymysql, 'connect', database.connect)
+    patch.setenv('BOT_BACKGROUND_JOBS', '0')
+    for name in ('BOT_REDIS_URL', 'BOT_DB_REPLICAS', 'BOT_RECORD_UPDATES'):
+        patch.delenv(name, raising=False)
+    import bot
+    yield SimpleNamespace(bot=bot, database=database)
+    patch.undo()
+
+
+@pytest.fixture
+def sent(bot_env, monkeypatch):
+    """Сообщения, отправленные ботом: (chat_id, текст)"""
+    messages = []
+
+    def send_message(chat_id, text, **kwargs):
+        messages.append((chat_id, text))
+        return SimpleNamespace(chat=SimpleNamespace(id=chat_id), message_id=len(messages))
+
+    def edit_message_text(text, chat_id, message_id, **kwargs):
+        messages.append((chat_id, text))
+
+    monkeypatch.setattr(bot_env.bot.bot, 'send_message', send_message)
+    monkeypatch.setattr(bot_env.bot.bot, 'edit_message_text', edit_message_text)
+    monkeypatch.setattr(bot_env.bot.bot, 'answer_callback_query', lambda *args, **kwargs: None)
+    return messages
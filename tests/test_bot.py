@@ -0,0 +1,143 @@
+import threading
+import time
+from types import SimpleNamespace
+
+
+def message(chat_id, text='/start'):
+    return SimpleNamespace(chat=SimpleNamespace(id=chat_id), from_user=SimpleNamespace(first_name='Тест'),
+                           text=text, message_id=1, content_type='text')
+
+
+def price_alert_row(chat_id, article):
+    return {'articule': article, 'chat_id': chat_id, 'name': f"Товар {article}", 'initial_price': 100,
+            'digest_interval': None}
+
+
+def test_chat_deleted_by_gc_gets_alerts_after_start(bot_env, sent, monkeypatch):
+    bot, database = bot_env.bot, bot_env.database
+    chat_id = 3901
+    bot.deactivate_chat(chat_id)
+    assert chat_id in bot.inactive_chats
+
+    # Фоновая очистка удаляет запись отключенного пользователя
+    deleted = []
+    database.respond(r'SELECT chat_id FROM botUser WHERE active = 0 AND deactivated_at',
+                     lambda params: [] if deleted else [{'chat_id': chat_id}])
+    database.respond(r'DELETE FROM botUser', lambda params: deleted.extend(params) or len(params))
+    monkeypatch.setattr(bot, 'is_gc_time', lambda: True)
+    monkeypatch.setattr(bot, 'GC_BATCH_PAUSE', 0)
+    bot.gc_inactive_users()
+    assert deleted == [chat_id]
+
+    # Пользователь возвращается: записи в botUser уже нет, она создается заново
+    bot.start(message(chat_id))
+    assert chat_id not in bot.inactive_chats
+
+    bot.notify_price_change(price_alert_row(chat_id, 11), {'price': 80, 'currency_symbol': '₽'})
+    assert any(chat == chat_id and 'Цена' in text for chat, text in sent)
+
+
+def test_product_added_by_recreated_chat_is_active(bot_env, sent):
+    bot = bot_env.bot
+    chat_id = 3902
+    bot.inactive_chats.add(chat_id)  # Остался с прошлого отключения, запись удалена очисткой
+    bot_env.database.respond(r'INSERT IGNORE INTO botUser', 1)
+    bot.get_article = lambda msg: None  # Дальше создания пользователя обработка не нужна
+    try:
+        bot.process_product(message(chat_id, 'https://example'))
+    finally:
+        del bot.get_article
+    assert chat_id not in bot.inactive_chats
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "условие не выполнилось"
+        time.sleep(0.01)
+
+
+def start_blocked_price_writes(bot_env, monkeypatch, blocked_price):
+    """Запись цены blocked_price в БД ждет release; возвращает (началась запись, release, записанные цены)"""
+    started, release, written = threading.Event(), threading.Event(), []
+
+    def update_price(params):
+        if params[0] == blocked_price:
+            started.set()
+            release.wait(5)
+        written.append(params[0])
+        return 1
+
+    bot_env.database.respond(r'UPDATE price SET initial_price', update_price)
+    bot_env.database.respond(r'SELECT p.articule\s+FROM product p', lambda params: [{'articule': params[0] * 10}])
+    prices = {'rub': 100, 'kzt': 500, 'byn': 2}
+    monkeypatch.setattr(bot_env.bot, 'get_cached_price',
+                        lambda article, currency: {'success': True, 'price': prices[currency]})
+    return started, release, written
+
+
+def test_currency_change_does_not_wait_for_another_chat_write(bot_env, sent, monkeypatch):
+    bot = bot_env.bot
+    started, release, written = start_blocked_price_writes(bot_env, monkeypatch, 500)
+    try:
+        bot.reprice_in_background(4301, 'kzt', 1)
+        assert started.wait(5)
+
+        begin = time.time()
+        bot.reprice_in_background(4302, 'byn', 1)
+        assert time.time() - begin < 0.5
+        wait_for(lambda: 2 in written)
+    finally:
+        release.set()
+    wait_for(lambda: not bot.repricing_chats)
+
+
+def test_superseded_reprice_does_not_overwrite_newer_job(bot_env, sent, monkeypatch):
+    bot = bot_env.bot
+    chat_id = 4303
+    started, release, written = start_blocked_price_writes(bot_env, monkeypatch, 500)
+    try:
+        bot.reprice_in_background(chat_id, 'kzt', 1)
+        assert started.wait(5)
+        # Пользователь снова сменил валюту, пока старое задание пишет цены
+        bot.reprice_in_background(chat_id, 'rub', 1)
+        time.sleep(0.2)
+        assert written == []
+    finally:
+        release.set()
+    wait_for(lambda: len(written) == 2)
+    assert written == [500, 100]
+    wait_for(lambda: chat_id not in bot.repricing_chats)
+
+
+def callback(chat_id, data):
+    return SimpleNamespace(id='1', data=data, from_user=SimpleNamespace(first_name='Тест'),
+                           message=SimpleNamespace(chat=SimpleNamespace(id=chat_id), message_id=1,
+                                                   content_type='text'))
+
+
+def test_chat_reads_its_own_writes_from_primary(bot_env, sent, monkeypatch):
+    bot, database = bot_env.bot, bot_env.database
+    monkeypatch.setattr(bot.db, 'replicas', [{'host': 'replica', 'port': 3306}])
+    monkeypatch.setattr(bot.db, 'replica_lag', {0: (0, time.time() + 3600)})  # Реплика в порядке
+    database.respond(r'SELECT COUNT\(\*\) as cnt\s+FROM product_has_botUser', [{'cnt': 1}])
+    database.respond(r'SELECT active FROM botUser', [{'active': 1}])
+    database.respond(r'SELECT treshold_percent, notification_type FROM botUser',
+                     [{'treshold_percent': 5, 'notification_type': 'any'}])
+
+    def hosts_of(pattern, action):
+        start = len(database.queries)
+        action()
+        return {host for (query, _), host in zip(database.queries[start:], database.hosts[start:])
+                if pattern in query}
+
+    # Без недавних изменений чтение идет на реплику
+    assert hosts_of('COUNT(*)', lambda: bot.callback_handler(callback(4501, 'main_menu'))) == {'replica'}
+
+    # Пользователь сменил валюту: счетчики и меню читаются с основной базы
+    bot.callback_handler(callback(4501, 'set_currency_kzt'))
+    assert hosts_of('COUNT(*)', lambda: bot.callback_handler(callback(4501, 'main_menu'))) == {'127.0.0.1'}
+    assert hosts_of('COUNT(*)', lambda: bot.start(message(4501))) == {'127.0.0.1'}
+    assert hosts_of('FROM product p', lambda: bot.callback_handler(callback(4501, 'my_products'))) == {'127.0.0.1'}
+    assert bot.get_user_settings(4501)[2] == 'kzt'
+    assert hosts_of('COUNT(*)', lambda: bot.callback_handler(callback(4502, 'main_menu'))) == {'replica'}
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from cache_backends import CacheBackend, LocalCache, RedisCache
+
+fakeredis = pytest.importorskip('fakeredis')
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "условие не выполнилось"
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def replicas():
+    """Две копии бота с общим Redis"""
+    server = fakeredis.FakeServer()
+    caches = [RedisCache(fakeredis.FakeRedis(server=server)) for _ in range(2)]
+    yield caches
+    for cache in caches:
+        if cache.listener is not None:
+            cache.listener.stop()
+
+
+def test_cache_backend_is_abstract():
+    with pytest.raises(TypeError):
+        CacheBackend()
+    assert LocalCache().acquire_lock('price_checker', 10)
+
+
+def test_values_are_shared(replicas):
+    first, second = replicas
+    first.set('1_rub', {'price': 100}, ttl=60)
+    assert second.get('1_rub') == {'price': 100}
+    second.delete('1_rub')
+    assert first.get('1_rub') is None
+
+
+def test_publish_reaches_other_replicas_only(replicas):
+    first, second = replicas
+    received = {0: [], 1: []}
+    first.subscribe(lambda kind, data: received[0].append((kind, data)))
+    second.subscribe(lambda kind, data: received[1].append((kind, data)))
+    time.sleep(0.2)  # Слушатели успевают подписаться на канал
+
+    first.publish('settings', {'chat_id': 7})
+    wait_for(lambda: received[1])
+    assert received[1] == [('settings', {'chat_id': 7})]
+    time.sleep(0.2)
+    assert received[0] == []
+
+
+def test_lock_acquire_renew_and_handoff(replicas):
+    first, second = replicas
+    assert first.acquire_lock('price_checker', 1)
+    assert not second.acquire_lock('price_checker', 1)
+
+    # Владелец продлевает блокировку, и она переживает исходный срок
+    time.sleep(0.6)
+    assert first.acquire_lock('price_checker', 1)
+    time.sleep(0.6)
+    assert not second.acquire_lock('price_checker', 1)
+    assert first.acquire_lock('price_checker', 1)
+
+    # Владелец перестал продлевать: после срока блокировку забирает другая копия
+    time.sleep(1.2)
+    assert second.acquire_lock('price_checker', 1)
+    assert not first.acquire_lock('price_checker', 1)
+
+
+def test_redis_errors_are_cache_misses():
+    server = fakeredis.FakeServer()
+    first = RedisCache(fakeredis.FakeRedis(server=server))
+    first.set('1_rub', 1)
+    server.connected = False  # Redis недоступен
+    assert first.get('1_rub') is None
+    first.set('1_rub', 1)
+    first.publish('settings', {})
+    assert not first.acquire_lock('price_checker', 1)
@@ -0,0 +1,44 @@
+import importlib.util
+import io
+import json
+import os
+import random
+
+import pytest
+
+# 12.py нельзя импортировать обычным import из-за имени файла
+spec = importlib.util.spec_from_file_location(
+    'json_stream', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '12.py')
+)
+json_stream = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(json_stream)
+
+
+def stream(text, chunk_size):
+    return list(json_stream.iter_json_array(io.StringIO(text), chunk_size=chunk_size))
+
+
+@pytest.mark.parametrize('chunk_size', range(1, 80))
+def test_value_split_at_chunk_boundary(chunk_size):
+    products = [-25000000000.0, {'name': 'Молоко', 'price': 12345}, 1e-7, 'строка', 77, True, None, [1, 2.5]]
+    text = json.dumps({'products': products})
+    assert stream(text, chunk_size) == products
+
+
+def test_stream_matches_json_load():
+    rng = random.Random(1)
+    for _ in range(200):
+        products = [
+            rng.choice([rng.uniform(-1e12, 1e12), rng.randint(-10 ** 15, 10 ** 15), 'товар', None, False,
+                        {'name': 'п' * rng.randint(0, 9), 'price': rng.random(), 'available': True}])
+            for _ in range(rng.randint(0, 15))
+        ]
+        text = json.dumps({'meta': [1, {'a': 'b'}], 'products': products},
+                          indent=rng.choice([None, 1]), ensure_ascii=rng.random() < 0.5)
+        assert stream(text, 64) == json.load(io.StringIO(text))['products']
+
+
+def test_malformed_value_is_reported():
+    result = stream('{"products": [{"a": 1}, 12abc, {"b": 2}]}', 5)
+    assert result[0] == {'a': 1} and result[2] == {'b': 2}
+    assert isinstance(result[1], json_stream.MalformedProduct) and result[1].number == 2
@@ -0,0 +1,100 @@
+import random
+
+from price_alerts import SubscriptionStore, TriggerIndex, is_price_change_triggered
+
+
+def subscription_row(article, chat_id):
+    return {
+        'articule': article, 'name': f"Товар {article}", 'initial_price': 100, 'curent_price': 100,
+        'unavailable_since': None, 'chat_id': chat_id, 'currency': 'rub', 'treshold_percent': 5,
+        'notification_type': 'any', 'digest_interval': None
+    }
+
+
+def subscribers(store, article):
+    return sorted(row['chat_id'] for batch in store.iter_batches(100) for row in batch if row['articule'] == article)
+
+
+def add(store, article, chat_id):
+    store.add_subscription(article, f"Товар {article}", 100, chat_id, 5, 'any', 'rub', None)
+
+
+def test_remove_missing_subscription_then_add():
+    store = SubscriptionStore()
+    store.load([subscription_row(1, 100), subscription_row(2, 100)])
+    add(store, 3, 200)  # Пользователь 200 известен хранилищу, но на товар 2 не подписан
+
+    store.remove_subscription(2, 200)
+    assert subscribers(store, 2) == [100]
+
+    add(store, 2, 200)
+    assert subscribers(store, 2) == [100, 200]
+    assert store.subscription_count() == 4
+
+
+def test_replay_onto_load_that_already_has_changes():
+    # Загрузка из БД уже видит и удаление (2, 200), и добавление (1, 200)
+    store = SubscriptionStore()
+    store.load([subscription_row(1, 100), subscription_row(1, 200), subscription_row(2, 100)])
+
+    # Повтор журнала изменений, сделанных во время загрузки
+    store.remove_subscription(2, 200)
+    add(store, 1, 200)
+    assert subscribers(store, 1) == [100, 200]
+    assert subscribers(store, 2) == [100]
+    assert store.subscription_count() == 3
+
+    # Пользователь снова подписывается на товар 2 после перезагрузки
+    add(store, 2, 200)
+    assert subscribers(store, 2) == [100, 200]
+    store.compact()
+    assert subscribers(store, 2) == [100, 200]
+
+
+def test_remove_twice_then_add():
+    store = SubscriptionStore()
+    store.load([subscription_row(1, 100), subscription_row(1, 200)])
+    store.remove_subscription(1, 200)
+    store.remove_subscription(1, 200)
+    assert subscribers(store, 1) == [100]
+    add(store, 1, 200)
+    assert subscribers(store, 1) == [100, 200]
+    assert store.subscription_count() == 2
+
+
+def index_triggered(index, article, new_price):
+    if index.is_in_band(article, new_price):
+        return set()
+    return index.crossed(article, new_price)
+
+
+def test_trigger_index_matches_per_row_check():
+    rng = random.Random(33)
+    for _ in range(300):
+        old_price = rng.randint(1, 2000)
+        rows = [
+            (1, chat_id, rng.choice([0, 1, 3, 5, 10, 50]), rng.choice(['any', 'increase', 'decrease']), old_price)
+            for chat_id in range(rng.randint(1, 6))
+        ]
+        index = TriggerIndex()
+        index.load(rows)
+        spread = max(1, old_price // 5)
+        for new_price in [old_price, old_price - 1, old_price + 1] + [
+            rng.randint(max(0, old_price - spread), old_price + spread) for _ in range(10)
+        ]:
+            expected = {
+                chat_id for _, chat_id, threshold, notif_type, _ in rows
+                if is_price_change_triggered(old_price, new_price, threshold, notif_type)
+            }
+            assert index_triggered(index, 1, new_price) == expected, (rows, new_price)
+
+
+def test_zero_threshold_any_fires_on_unchanged_price():
+    index = TriggerIndex()
+    index.load([(1, 100, 0, 'any', 500), (1, 200, 5, 'any', 500)])
+    assert is_price_change_triggered(500, 500, 0, 'any')
+    assert not index.is_in_band(1, 500)
+    assert index.crossed(1, 500) == {100}
+
+    index.update_chat_settings(100, 3, 'any')
+    assert index.is_in_band(1, 500)